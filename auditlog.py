@@ -0,0 +1,154 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613
+# pyright: reportMissingImports=false, reportMissingModuleSource=false
+import time
+import asyncio
+from collections import deque
+from datetime import timedelta
+import discord
+import config
+import logsetup
+
+
+#Setup module logging
+log = logsetup.get_logger(__name__)
+
+
+class AuditLogTailer:
+    """Single reader of the guild audit log, shared by the event listeners.
+
+    Listeners ask for the entry of a given action and target instead of
+    reading the last audit log entry themselves. New entries are fetched
+    incrementally, after the last one seen, at most once per interval and
+    only while someone is waiting. Entries nobody asked for yet are kept for
+    a short time, so an event arriving after its entry was fetched still
+    finds it, and a burst of actions maps each event to its own entry.
+    """
+
+    def __init__(self, bot, guild_id=None, interval=None, ttl=None):
+        self.bot = bot
+        self.guild_id = guild_id or config.GUILD
+        # Minimum seconds between two audit log requests
+        self.interval = interval if interval is not None else getattr(config, "AUDITLOG_INTERVAL", 2)
+        # Seconds an unclaimed entry stays in the index
+        self.ttl = ttl if ttl is not None else getattr(config, "AUDITLOG_TTL", 60)
+        self._last_id = None
+        self._index = {} # (action, target_id) -> deque of (seen, entry)
+        self._waiters = {} # (action, target_id) -> list of (check, future)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        """Start the polling task, once."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def wait_for(self, action: discord.AuditLogAction, target_id: int,
+                       timeout: float = None, check=None) -> discord.AuditLogEntry:
+        """Return the audit log entry of action on target_id.
+
+        Keyword arguments:
+        action      -- audit log action to look for
+        target_id   -- ID of the user, member or object the action targets
+        timeout     -- seconds to wait for the entry, None if it never shows up
+        check       -- optional predicate the entry has to satisfy
+        """
+        if timeout is None:
+            timeout = getattr(config, "AUDITLOG_TIMEOUT", 5)
+        key = (action, target_id)
+
+        entry = self._claim(key, check)
+        if entry is not None:
+            return entry
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append((check, future))
+        self._wakeup.set()
+
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            log.info("No audit log entry for %s on %s", action, target_id)
+            return None
+        finally:
+            waiters = self._waiters.get(key, [])
+            if (check, future) in waiters:
+                waiters.remove((check, future))
+            if not waiters:
+                self._waiters.pop(key, None)
+
+    def _claim(self, key, check):
+        """Remove and return the oldest indexed entry for key matching check."""
+        entries = self._index.get(key)
+        if not entries:
+            return None
+        for item in entries:
+            if check is None or check(item[1]):
+                entries.remove(item)
+                if not entries:
+                    del self._index[key]
+                return item[1]
+        return None
+
+    def _dispatch(self, entry):
+        """Hand a new entry to its waiter, or index it for later."""
+        target_id = getattr(entry.target, "id", None)
+        if target_id is None:
+            return
+        # Too old to be the entry of a current event
+        if entry.created_at < self._cutoff():
+            return
+        key = (entry.action, target_id)
+
+        for check, future in self._waiters.get(key, []):
+            if not future.done() and (check is None or check(entry)):
+                future.set_result(entry)
+                return
+
+        self._index.setdefault(key, deque()).append((time.monotonic(), entry))
+
+    def _cutoff(self):
+        """Creation time of the oldest entry still handed to listeners."""
+        return discord.utils.utcnow() - timedelta(seconds=self.ttl)
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.ttl
+        for key in list(self._index):
+            entries = self._index[key]
+            while entries and entries[0][0] < cutoff:
+                entries.popleft()
+            if not entries:
+                del self._index[key]
+
+    async def _poll(self):
+        guild = self.bot.get_guild(self.guild_id)
+        if guild is None:
+            return
+
+        # Start from the entries made shortly before the request, after a
+        # quiet period older entries would only be dropped by _dispatch
+        oldest = discord.utils.time_snowflake(self._cutoff())
+        if self._last_id is None or self._last_id < oldest:
+            self._last_id = oldest
+
+        # Entries come oldest first when fetching after an ID
+        async for entry in guild.audit_logs(limit=None, after=discord.Object(id=self._last_id)):
+            self._last_id = max(self._last_id, entry.id)
+            self._dispatch(entry)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            try:
+                await self._poll()
+            except discord.Forbidden:
+                log.error("Missing permission to read the audit log")
+            except Exception:
+                log.exception("Error while reading the audit log")
+            self._prune()
+
+            # Keep polling while listeners are still waiting
+            if self._waiters:
+                self._wakeup.set()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,479 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613
+# pyright: reportMissingImports=false, reportMissingModuleSource=false
+"""Throughput benchmark for the message filters in cogs/events.py.
+
+Replays a corpus of synthetic messages (clean chat, invite spam, nitro scams,
+blacklist hits, clan ads and message links) through Events.on_message and
+through each check function, using stub Discord objects and an in-memory
+stand-in for the database. Nothing is sent to Discord or MariaDB.
+
+Run from anywhere with the bot requirements installed:
+
+    python benchmarks/bench_filters.py --messages 5000
+
+The word lists come from config.py when it exists, so filter changes can be
+measured against the lists used on the live server. Without config.py a small
+synthetic configuration is used instead.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import statistics
+import string
+import sys
+import time
+import tracemalloc
+import types
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.makedirs("logs", exist_ok=True)
+
+GUILD_ID = 1000
+MOD_ROLE = 2000
+ADMIN_ROLE = 2001
+BOT_ROLE = 2002
+CHAT_CHAN = 3000
+CLAN_CHAN = 3001
+LOG_CHAN = 3002
+
+
+def synthetic_config():
+    """Config module used when config.py is not available."""
+    conf = types.ModuleType("config")
+    conf.GUILD = GUILD_ID
+    conf.MOD_ID = MOD_ROLE
+    conf.ADMIN_ID = ADMIN_ROLE
+    conf.BOT_ID = BOT_ROLE
+    conf.CLAN_CHAN = CLAN_CHAN
+    conf.LOG_CHAN = LOG_CHAN
+    conf.FOOTER = "benchmark"
+    conf.RED, conf.GREEN, conf.YELLOW = 0xE74C3C, 0x27AE60, 0xF1C40F
+    conf.BLUE, conf.ORANGE, conf.PURPLE = 0x3498DB, 0xF39C12, 0x8E44AD
+    conf.BLACKLIST = ["badword%d" % i for i in range(200)]
+    conf.SCAMTEXT = ["free nitro", "nitro for free", "steam gift", "airdrop"]
+    conf.SCAMURLS = ["dlscord-gift%d.com" % i for i in range(500)]
+    conf.INVITE_WHITELIST = ["discord.gg/operators"]
+    conf.INVITE_BANLIST = ["discord.gg/raid%d" % i for i in range(50)]
+    conf.NSFW = ["hot singles", "18+ content"]
+    return conf
+
+
+try:
+    import config
+except ImportError:
+    config = synthetic_config()
+    sys.modules["config"] = config
+
+import cogs.events as events
+from scamtracker import ScamTracker
+from incidents import IncidentTracker
+
+# Keep per-message log lines out of the measurements
+logging.getLogger(events.__name__).setLevel(logging.WARNING)
+
+
+# --- Stub Discord objects ---
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+        self.mention = f"<@&{role_id}>"
+
+
+class FakeMember:
+    def __init__(self, member_id, roles=()):
+        self.id = member_id
+        self.name = f"user{member_id}"
+        self.discriminator = "0001"
+        self.mention = f"<@{member_id}>"
+        self.roles = list(roles)
+        self.joined_at = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        self.created_at = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        self.avatar = types.SimpleNamespace(url="https://example.invalid/avatar.png")
+
+    def __str__(self):
+        return f"{self.name}#{self.discriminator}"
+
+    async def timeout_for(self, *args, **kwargs):
+        pass
+
+    async def remove_timeout(self, *args, **kwargs):
+        pass
+
+    async def ban(self, *args, **kwargs):
+        pass
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild=None):
+        self.id = channel_id
+        self.guild = guild
+        self.mention = f"<#{channel_id}>"
+        self.sent = 0
+
+    def __str__(self):
+        return f"channel{self.id}"
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+        return FakeMessage("", BOT_USER, self, self.guild)
+
+    async def fetch_message(self, message_id):
+        return FakeMessage("linked message", FakeMember(message_id), self, self.guild)
+
+
+class FakeGuild:
+    def __init__(self):
+        self.id = GUILD_ID
+        self.roles = {r: FakeRole(r) for r in (config.MOD_ID, config.ADMIN_ID, config.BOT_ID)}
+        self.channels = {}
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    def get_channel(self, channel_id):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(channel_id, self)
+        return self.channels[channel_id]
+
+    def get_member(self, member_id):
+        return None
+
+    async def ban(self, *args, **kwargs):
+        pass
+
+    async def kick(self, *args, **kwargs):
+        pass
+
+
+class FakeMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, content, author, channel, guild):
+        self.id = next(self._ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+        self.attachments = []
+        self.created_at = datetime.now(timezone.utc)
+        self.deleted = False
+
+    async def delete(self, *args, **kwargs):
+        self.deleted = True
+
+    async def edit(self, *args, **kwargs):
+        pass
+
+    async def reply(self, *args, **kwargs):
+        return FakeMessage("", BOT_USER, self.channel, self.guild)
+
+
+class FakeView:
+    """Stand-in for the persistent review views."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+BOT_USER = FakeMember(1, roles=[FakeRole(BOT_ROLE)])
+
+
+# --- In-memory database ---
+class FakeJac:
+    def __init__(self):
+        self.loaded = True
+        self.users = set()
+        self.links = set()
+
+    def has_user(self, user_id):
+        return user_id in self.users
+
+    def has_link(self, link):
+        return link in self.links
+
+
+class FakeDatabase:
+    """In-memory stand-in for AsyncDatabase, covering the calls made by the checks."""
+
+    def __init__(self):
+        self.jac = FakeJac()
+        self.kills = {}
+        self.warn_users = {}
+        self.warn_reasons = []
+        self.reviews = {}
+
+    async def loadJac(self):
+        return self.jac
+
+    async def addJac(self, user_id, link, date):
+        self.jac.users.add(user_id)
+        self.jac.links.add(link)
+
+    async def addKillCount(self, user_id):
+        self.kills[user_id] = self.kills.get(user_id, 0) + 1
+
+    async def getWarnUserByID(self, user_id):
+        return self.warn_users.get(user_id)
+
+    async def getWarnCount(self, user_id, reason):
+        return sum(1 for u, r in self.warn_reasons if u == user_id and r == reason)
+
+    async def addWarning(self, user_id, tag, reason):
+        self.warn_users.setdefault(user_id, {"user_id": user_id, "warnings": 0})["warnings"] += 1
+        self.warn_reasons.append((user_id, reason))
+
+    async def addKick(self, user_id, tag, reason):
+        self.warn_reasons.append((user_id, reason))
+
+    async def addReview(self, message_id, kind, user_id, data=None):
+        self.reviews[message_id] = (kind, user_id, data)
+
+
+class FakeModLog:
+    """Mod-log dispatcher that drops every embed."""
+
+    def __init__(self):
+        self.posted = 0
+
+    def post(self, embed, view=None):
+        self.posted += 1
+
+    async def send(self, embed, view=None):
+        self.post(embed, view)
+        return FakeMessage("", BOT_USER, None, None)
+
+
+# --- Corpus ---
+WORDS = [
+    "".join(random.Random(i).choices(string.ascii_lowercase, k=random.Random(i).randint(2, 9)))
+    for i in range(500)
+]
+
+
+def chat(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def pick(rng, words, default):
+    return rng.choice(words) if words else default
+
+
+def build_corpus(rng, count, guild):
+    """Generate (kind, message) pairs with a realistic mix of traffic."""
+    chat_chan = guild.get_channel(CHAT_CHAN)
+    clan_chan = guild.get_channel(config.CLAN_CHAN)
+    kinds = [
+        ("clean", 70),
+        ("invite", 6),
+        ("nitro", 6),
+        ("scamurl", 5),
+        ("blacklist", 5),
+        ("msglink", 4),
+        ("clan", 4),
+    ]
+    population = [k for k, w in kinds for _ in range(w)]
+
+    corpus = []
+    for i in range(count):
+        kind = rng.choice(population)
+        author = FakeMember(10_000 + rng.randrange(count))
+        channel = chat_chan
+
+        if kind == "clean":
+            content = chat(rng, rng.randint(3, 30))
+        elif kind == "invite":
+            content = f"{chat(rng, 4)} discord.gg/{chat(rng, 1)}{i}"
+        elif kind == "nitro":
+            text = pick(rng, config.SCAMTEXT, "free nitro")
+            content = f"@everyone {text} https://nitro-{i}.example/claim"
+        elif kind == "scamurl":
+            domain = pick(rng, config.SCAMURLS, "dlscord-gift.com")
+            content = f"{chat(rng, 5)} https://{domain}/{i}"
+        elif kind == "blacklist":
+            content = f"{chat(rng, 6)} {pick(rng, config.BLACKLIST, 'badword')} {chat(rng, 3)}"
+        elif kind == "msglink":
+            content = f"look https://discord.com/channels/{GUILD_ID}/{CHAT_CHAN}/{i + 1}"
+        else:
+            channel = clan_chan
+            content = f"Recruiting! {chat(rng, 10)} https://discord.gg/clan{rng.randrange(count // 4 + 1)}"
+
+        corpus.append((kind, FakeMessage(content, author, channel, guild)))
+    return corpus
+
+
+# --- Runner ---
+async def check_outcomes(cog, guild):
+    """Run messages whose outcome is known through the checks, before timing them."""
+    channel = guild.get_channel(CHAT_CHAN)
+    for invite in config.INVITE_WHITELIST[:1]:
+        # Whitelisted invites are kept whatever their case
+        message = FakeMessage(f"join us {invite.capitalize()}", FakeMember(1), channel, guild)
+        await events.check_invites(cog, message, events.filters.MessageAnalysis(message.content))
+        assert not message.deleted, f"whitelisted invite {message.content!r} was deleted"
+    reset_state(cog)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def reset_state(cog):
+    cog.bot.scams = ScamTracker(redis_url=None)
+    # Reviews of joined scam waves are edited after the run, never during it
+    cog.bot.incidents = IncidentTracker(cog.bot, interval=3600)
+    cog.bot.modlog.posted = 0
+    cog.database = FakeDatabase()
+
+
+async def run_checks(cog, corpus):
+    """Time each check function separately, in on_message order."""
+    stages = {
+        "analysis": [],
+        "check_invites": [],
+        "check_spam_v2": [],
+        "check_scam": [],
+        "check_jac": [],
+        "check_blacklist": [],
+        "check_msg_link": [],
+    }
+    clock = time.perf_counter_ns
+
+    for _, message in corpus:
+        start = clock()
+        analysis = events.filters.MessageAnalysis(message.content)
+        stages["analysis"].append(clock() - start)
+
+        start = clock()
+        await events.check_invites(cog, message, analysis)
+        stages["check_invites"].append(clock() - start)
+
+        start = clock()
+        spam = await events.check_spam_v2(cog, message, analysis)
+        stages["check_spam_v2"].append(clock() - start)
+
+        if not spam:
+            start = clock()
+            await events.check_scam(cog, message, analysis)
+            stages["check_scam"].append(clock() - start)
+
+        start = clock()
+        await events.check_jac(cog, message, analysis)
+        stages["check_jac"].append(clock() - start)
+
+        start = clock()
+        await events.check_blacklist(cog, message, analysis)
+        stages["check_blacklist"].append(clock() - start)
+
+        start = clock()
+        await events.check_msg_link(cog, message, analysis)
+        stages["check_msg_link"].append(clock() - start)
+    return stages
+
+
+async def run_on_message(cog, corpus):
+    """Time the whole on_message listener per message."""
+    samples = []
+    clock = time.perf_counter_ns
+    for _, message in corpus:
+        start = clock()
+        await cog.on_message(message)
+        samples.append(clock() - start)
+    return samples
+
+
+async def run_allocations(cog, corpus):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    for _, message in corpus:
+        await cog.on_message(message)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename") if stat.size_diff > 0)
+    return allocated, peak
+
+
+def report(title, samples, total_ns=None):
+    if not samples:
+        print(f"{title:<16} {'-':>10}")
+        return
+    total_ns = total_ns or sum(samples)
+    rate = len(samples) / (total_ns / 1e9) if total_ns else float("inf")
+    print(
+        f"{title:<16} {len(samples):>8} {rate:>12.0f} "
+        f"{percentile(samples, 50) / 1000:>10.1f} {percentile(samples, 99) / 1000:>10.1f} "
+        f"{statistics.fmean(samples) / 1000:>10.1f}"
+    )
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    guild = FakeGuild()
+    bot = types.SimpleNamespace(user=BOT_USER, database=FakeDatabase(), modlog=FakeModLog(), scamfeed=None)
+
+    # Keep discord.ui out of the measurements
+    events.support = types.SimpleNamespace(
+        ScamReview=FakeView, UnbanReview=FakeView, UntimeoutReview=FakeView, RemoveReview=FakeView,
+        REVIEW_SCAM="scam", REVIEW_UNBAN="unban", REVIEW_UNTIMEOUT="untimeout", REVIEW_REMOVE="remove",
+        timeout_embed=lambda *a, **k: None, store_review=events.support.store_review,
+    )
+
+    cog = events.Events(bot)
+    corpus = build_corpus(rng, args.messages, guild)
+
+    counts = {}
+    for kind, _ in corpus:
+        counts[kind] = counts.get(kind, 0) + 1
+    print(f"Corpus: {args.messages} messages, " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    print(f"Lists: BLACKLIST={len(config.BLACKLIST)} SCAMTEXT={len(config.SCAMTEXT)} "
+          f"SCAMURLS={len(config.SCAMURLS)} INVITE_WHITELIST={len(config.INVITE_WHITELIST)}")
+    print()
+
+    header = f"{'stage':<16} {'calls':>8} {'msg/s':>12} {'p50 us':>10} {'p99 us':>10} {'mean us':>10}"
+
+    reset_state(cog)
+    await check_outcomes(cog, guild)
+
+    for run in range(args.repeat):
+        reset_state(cog)
+        stages = await run_checks(cog, corpus)
+
+        reset_state(cog)
+        start = time.perf_counter_ns()
+        samples = await run_on_message(cog, corpus)
+        elapsed = time.perf_counter_ns() - start
+
+        print(f"Run {run + 1}/{args.repeat}")
+        print(header)
+        for stage, stage_samples in stages.items():
+            report(stage, stage_samples)
+        report("on_message", samples, elapsed)
+        print(f"Mod log embeds: {cog.bot.modlog.posted}, scam incidents: {len(cog.bot.incidents._incidents)}")
+        print()
+
+    reset_state(cog)
+    allocated, peak = await run_allocations(cog, corpus)
+    print(f"Allocations: {allocated / len(corpus):.0f} B retained/msg, peak {peak / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000, help="number of synthetic messages")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs")
+    parser.add_argument("--seed", type=int, default=1, help="corpus random seed")
+    asyncio.run(main(parser.parse_args()))
@@ -83,6 +83,35 @@ class Admin(commands.Cog):
 
         await chann.send(config.DAYZ_ANNOUNCE, view=support.Survivor())
 
+    @commands.command(name="dbstats", hidden=True)
+    @commands.is_owner()
+    async def dbstats(self, ctx, action: str = None):
+        """Shows query timings and pool wait, `!dbstats reset` clears them."""
+        stats = self.bot.database.stats
+        if action == "reset":
+            stats.reset()
+            await ctx.reply("Query stats reset.")
+            return
+
+        pool = await self.bot.database.pool_stats()
+        summary = stats.summary(limit=15)
+        await ctx.reply(
+            f"Pool: {pool['size']}/{pool['max_size']} connections, "
+            f"{pool['exhausted']} exhausted, {pool['timeouts']} timeouts\n"
+            f"```\n{summary[:1800]}\n```")
+
+    @commands.command(name="scamfeed", hidden=True)
+    @commands.is_owner()
+    async def scamfeed(self, ctx):
+        """Rebuilds the scam domain index from the feeds in SCAM_FEEDS."""
+        try:
+            count = await self.bot.scamfeed.reload()
+        except Exception as e:
+            await ctx.reply("Error rebuilding the scam feed index.")
+            await ctx.send("{}: {}".format(type(e).__name__, e))
+        else:
+            await ctx.reply(f"Scam feed index rebuilt with {count} domains.")
+
     @commands.command(name="weird", hidden=True)
     @commands.is_owner()
     async def weird(self, ctx):
@@ -1,41 +1,27 @@
 # pylint: disable=F0401, W0702, W0703, W0105, W0613, W1203
 import os
 import sys # For sys.exit on critical errors
+import time
+import asyncio
+import bisect
+import functools
+import heapq
+import json
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import pytz
 import mariadb
 from discord.ext import commands
-import logging
-from logging.handlers import RotatingFileHandler
+import logsetup
 
 # --- Logging Setup ---
-log = logging.getLogger(__name__)
-log.setLevel(logging.INFO) # Or DEBUG for more verbose pool info
-log_formatter = logging.Formatter("%(name)s - %(asctime)s:%(levelname)s: %(message)s")
-
-# Ensure logs directory exists
-log_dir = "logs"
-if not os.path.exists(log_dir):
-    try:
-        os.makedirs(log_dir)
-    except OSError as e:
-        # Use root logger temporarily if module logger fails early
-        logging.basicConfig(level=logging.ERROR)
-        logging.critical(f"Failed to create log directory {log_dir}: {e}")
-        sys.exit("Error: Could not create log directory.")
-
-file_handler = RotatingFileHandler(
-    filename=os.path.join(log_dir, f"{__name__}.log"),
-    mode="a",
-    maxBytes=20000,
-    backupCount=5,
-    encoding="utf-8")
-file_handler.setFormatter(log_formatter)
-
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(log_formatter)
-
-log.addHandler(file_handler)
-log.addHandler(console_handler)
+# Or logging.DEBUG for more verbose pool info
+log = logsetup.get_logger(__name__)
 
 # --- Load Environment Variables ---
 load_dotenv()
@@ -56,47 +42,715 @@ except ValueError:
     log.critical(f"Invalid DB_PORT value: '{DB_PORT_STR}'. Must be an integer.")
     sys.exit("Error: Invalid DB_PORT.")
 
+# Pool sizing, optional in .env
+try:
+    DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+    DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+except ValueError:
+    log.critical("Invalid DB_POOL_MIN, DB_POOL_MAX or DB_POOL_TIMEOUT value. Must be numbers.")
+    sys.exit("Error: Invalid pool configuration.")
+
+# Kill counter write-behind, optional in .env
+try:
+    DB_KILL_FLUSH_SIZE = int(os.getenv("DB_KILL_FLUSH_SIZE", "100"))
+    DB_KILL_FLUSH_INTERVAL = float(os.getenv("DB_KILL_FLUSH_INTERVAL", "10"))
+except ValueError:
+    log.critical("Invalid DB_KILL_FLUSH_SIZE or DB_KILL_FLUSH_INTERVAL value. Must be numbers.")
+    sys.exit("Error: Invalid kill counter configuration.")
+
+# Query instrumentation, optional in .env
+try:
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "250"))
+    DB_STATS_INTERVAL = float(os.getenv("DB_STATS_INTERVAL", "60"))
+except ValueError:
+    log.critical("Invalid DB_SLOW_QUERY_MS or DB_STATS_INTERVAL value. Must be numbers.")
+    sys.exit("Error: Invalid query stats configuration.")
+
+if not 0 < DB_POOL_MIN <= DB_POOL_MAX:
+    log.critical(f"Invalid pool size: DB_POOL_MIN={DB_POOL_MIN}, DB_POOL_MAX={DB_POOL_MAX}.")
+    sys.exit("Error: Invalid pool configuration.")
+
 # --- Connection Pool Configuration ---
 # Stored globally for access by the Database class instance
-# Adjust pool_size based on expected concurrent DB operations from the bot
-POOL_CONFIG = {
+# Arguments of every pooled connection, set on the pool once it is created
+CONNECTION_CONFIG = {
     'user': DB_USER,
     'password': DB_PASS,
     'host': DB_HOST,
     'port': DB_PORT,
     'database': DB_NAME,
+    'autocommit': False, # Explicitly manage commits
+}
+# pool_size is the upper bound, the pool starts with DB_POOL_MIN connections.
+# Connection arguments are kept out of it: given to the constructor they
+# make the pool open all pool_size connections at once
+POOL_CONFIG = {
     'pool_name': 'discord_bot_pool', # Name the pool
-    'pool_size': 5, # Start with 5, adjust as needed
-    'autocommit': False # Explicitly manage commits
-    # 'pool_reset_session': True # Optional: Reset session variables when connection is returned
+    'pool_size': DB_POOL_MAX,
+    # Keep the statements prepared on each connection when it is returned,
+    # every use ends with a commit or a rollback
+    'pool_reset_connection': False,
 }
 
+# The one pool shared by every Database user in the process
+_pool = None
+_pool_lock = threading.Lock()
+# Signalled when a connection is returned to the pool. Only the counters
+# below are used under it, connecting and pool calls happen outside
+_pool_available = threading.Condition(_pool_lock)
+_pool_returned = 0 # Connections returned so far, to tell if one came back
+_pool_growing = 0 # Connections being opened to grow the pool
+
+
+def create_pool():
+    """Create the process-wide connection pool, or return it if it already exists.
+
+    The pool is opened with DB_POOL_MIN connections and grows on demand up to
+    DB_POOL_MAX (pool_size) inside Database._get_connection.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        try:
+            pool = mariadb.ConnectionPool(**POOL_CONFIG)
+            pool.set_config(**CONNECTION_CONFIG)
+            for _ in range(DB_POOL_MIN):
+                pool.add_connection()
+        except mariadb.Error as e:
+            log.critical(f"CRITICAL: Failed to create connection pool '{POOL_CONFIG['pool_name']}': {e}", exc_info=True)
+            raise
+        _pool = pool
+        log.info("Connection pool '%s' created with %d/%d connections",
+                 POOL_CONFIG['pool_name'], _pool.connection_count, DB_POOL_MAX)
+        return _pool
+
+# Format of the date strings stored in the jac and timers tables
+DATE_FORMAT = "%b-%d-%Y %H:%M:%S"
+# Timezone of the stored dates
+TZ = pytz.timezone("US/Central")
+
+
+def to_datetime(value):
+    """Convert a date for a DATETIME column, naive and in the bot's timezone (US/Central).
+
+    Fractions of a second are dropped, as the columns store whole seconds.
+    """
+    if isinstance(value, str):
+        return datetime.strptime(value, DATE_FORMAT)
+    if value is not None:
+        return value.replace(tzinfo=None, microsecond=0)
+    return None
+
+
+# --- Schema Migrations ---
+# Same layout as DATE_FORMAT, for STR_TO_DATE. Formats are passed as query
+# parameters so their % signs are not taken as placeholders.
+SQL_DATE_FORMAT = "%b-%d-%Y %H:%i:%s"
+SQL_DATETIME_FORMAT = "%Y-%m-%d %H:%i:%s"
+
+# Shapes of the two formats, checked before STR_TO_DATE: in strict mode its
+# warning on a malformed string fails the whole UPDATE or DELETE
+SQL_DATE_PATTERN = r"^[A-Za-z]{3}-[0-9]{2}-[0-9]{4} [0-9]{2}:[0-9]{2}:[0-9]{2}$"
+SQL_DATETIME_PATTERN = r"^[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}$"
+
+
+def convert_date_column(table: str, column: str, nullable: bool):
+    """Migration step storing a column of DATE_FORMAT strings as DATETIME.
+
+    Does nothing if the column is already DATETIME, so a version that failed
+    further on can run again. Rows without a valid date are deleted, or the
+    date cleared when the column is nullable. Strict mode is lifted during
+    the conversion, a string of the right shape can still hold an invalid date.
+    """
+    def step(tx):
+        row = tx.execute(
+            "SELECT DATA_TYPE AS type FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+            (table, column)).fetchone()
+        if row is not None and row['type'].lower() == "datetime":
+            return
+
+        sql_mode = tx.execute("SELECT @@SESSION.sql_mode AS mode").fetchone()['mode']
+        tx.execute("SET SESSION sql_mode = REPLACE(REPLACE(@@SESSION.sql_mode, "
+                   "'STRICT_TRANS_TABLES', ''), 'STRICT_ALL_TABLES', '')")
+        try:
+            # Rewrite "Jan-31-2024 18:00:00" as "2024-01-31 18:00:00" so MODIFY can cast it
+            tx.execute(
+                f"UPDATE {table} SET {column} = DATE_FORMAT(STR_TO_DATE({column}, %s), %s) "
+                f"WHERE {column} REGEXP %s AND STR_TO_DATE({column}, %s) IS NOT NULL",
+                (SQL_DATE_FORMAT, SQL_DATETIME_FORMAT, SQL_DATE_PATTERN, SQL_DATE_FORMAT))
+            invalid = (f"WHERE {column} IS NOT NULL AND ({column} NOT REGEXP %s "
+                       f"OR STR_TO_DATE({column}, %s) IS NULL)")
+            if nullable:
+                tx.execute(f"UPDATE {table} SET {column} = NULL {invalid}",
+                           (SQL_DATETIME_PATTERN, SQL_DATETIME_FORMAT))
+            else:
+                # A JAC entry without a valid date would never expire
+                tx.execute(f"DELETE FROM {table} {invalid}",
+                           (SQL_DATETIME_PATTERN, SQL_DATETIME_FORMAT))
+        finally:
+            # Connections are not reset when returned to the pool
+            tx.execute("SET SESSION sql_mode = %s", (sql_mode,))
+        tx.execute(f"ALTER TABLE {table} MODIFY COLUMN {column} DATETIME {'NULL' if nullable else 'NOT NULL'}")
+    return step
+
+
+# (version, description, steps), a step is a statement, (statement, params)
+# or a function called with the transaction.
+# Applied in order, each version once, tracked in the schema_version table.
+MIGRATIONS = [
+    (1, "Create tables", [
+        # Same layout as the tables created by hand before migrations existed,
+        # dates still as strings so both cases go through version 2
+        """CREATE TABLE IF NOT EXISTS jac (
+            user_id VARCHAR(20) NOT NULL,
+            link VARCHAR(255) NOT NULL,
+            date VARCHAR(32) NOT NULL,
+            INDEX (user_id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS timers (
+            user_id VARCHAR(20) NOT NULL PRIMARY KEY,
+            ban BOOLEAN NOT NULL DEFAULT FALSE,
+            mute BOOLEAN NOT NULL DEFAULT FALSE,
+            endBan VARCHAR(32) NULL,
+            endMute VARCHAR(32) NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS warn_user (
+            user_id VARCHAR(20) NOT NULL PRIMARY KEY,
+            warnings INT NOT NULL DEFAULT 0,
+            kicks INT NOT NULL DEFAULT 0,
+            bans INT NOT NULL DEFAULT 0,
+            tag VARCHAR(64)
+        )""",
+        """CREATE TABLE IF NOT EXISTS warn_reasons (
+            id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            user_id VARCHAR(20) NOT NULL,
+            reason TEXT NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS kill_board (
+            user_id VARCHAR(20) NOT NULL PRIMARY KEY,
+            counter INT NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS reviews (
+            message_id VARCHAR(20) NOT NULL PRIMARY KEY,
+            kind VARCHAR(16) NOT NULL,
+            user_id VARCHAR(20) NOT NULL,
+            data TEXT
+        )""",
+    ]),
+    (2, "Store dates as DATETIME", [
+        convert_date_column("jac", "date", nullable=False),
+        convert_date_column("timers", "endBan", nullable=True),
+        convert_date_column("timers", "endMute", nullable=True),
+    ]),
+    (3, "Add lookup and expiry indexes", [
+        # Prefix lengths also fit tables created with TEXT columns
+        "CREATE INDEX IF NOT EXISTS idx_jac_link ON jac (link(191))",
+        "CREATE INDEX IF NOT EXISTS idx_jac_date ON jac (date)",
+        "CREATE INDEX IF NOT EXISTS idx_timers_endBan ON timers (endBan)",
+        "CREATE INDEX IF NOT EXISTS idx_timers_endMute ON timers (endMute)",
+        "CREATE INDEX IF NOT EXISTS idx_warn_reasons_user_reason ON warn_reasons (user_id, reason(191))",
+        "CREATE INDEX IF NOT EXISTS idx_kill_board_counter ON kill_board (counter)",
+    ]),
+    (4, "Index warn_reasons for paging", [
+        "CREATE INDEX IF NOT EXISTS idx_warn_reasons_user_id ON warn_reasons (user_id, id)",
+    ]),
+]
+
+
+# --- Statement Registry ---
+# Fixed statements by name. Each one is prepared once per pooled connection
+# and then re-executed through the binary protocol, see Database._prepared.
+STATEMENTS = {
+    # JAC
+    "jac.all": "SELECT user_id, link, date FROM jac ORDER BY user_id DESC",
+    "jac.by_user": "SELECT user_id, link, date FROM jac WHERE user_id=%s",
+    "jac.by_link": "SELECT user_id, link FROM jac WHERE link=%s",
+    "jac.add": "INSERT INTO jac (user_id, link, date) VALUES (%s, %s, %s)",
+    "jac.del": "DELETE FROM jac WHERE user_id=%s",
+    "jac.expire": "DELETE FROM jac WHERE date < %s LIMIT %s",
+    # Timers, NULL for the date of the timer that is not set
+    "timers.mute": """INSERT INTO timers (user_id, ban, mute, endBan, endMute)
+        VALUES (%s, false, true, NULL, %s)
+        ON DUPLICATE KEY UPDATE mute=true, endMute=%s""",
+    "timers.ban": """INSERT INTO timers (user_id, ban, mute, endBan, endMute)
+        VALUES (%s, true, false, %s, NULL)
+        ON DUPLICATE KEY UPDATE ban=true, endBan=%s""",
+    "timers.active": "SELECT user_id, ban, mute, endBan, endMute FROM timers WHERE ban=true OR mute=true",
+    "timers.page_first": """SELECT user_id, ban, mute, endBan, endMute FROM timers
+        WHERE (ban=true OR mute=true) ORDER BY user_id LIMIT %s""",
+    "timers.page": """SELECT user_id, ban, mute, endBan, endMute FROM timers
+        WHERE (ban=true OR mute=true) AND user_id > %s ORDER BY user_id LIMIT %s""",
+    # One indexed range scan per column instead of reading the whole table
+    "timers.due": """
+        SELECT user_id, ban, mute, endBan, endMute FROM timers WHERE mute=true AND endMute <= %s
+        UNION
+        SELECT user_id, ban, mute, endBan, endMute FROM timers WHERE ban=true AND endBan <= %s""",
+    "timers.del": "DELETE FROM timers WHERE user_id=%s",
+    "timers.clear_mute": "UPDATE timers SET mute=false, endMute=NULL WHERE user_id=%s",
+    "timers.clear_ban": "UPDATE timers SET ban=false, endBan=NULL WHERE user_id=%s",
+    # Expired timers only, not one set again while the old one was expiring
+    "timers.clear_mute_ended": "UPDATE timers SET mute=false, endMute=NULL WHERE user_id=%s AND endMute <= %s",
+    "timers.clear_ban_ended": "UPDATE timers SET ban=false, endBan=NULL WHERE user_id=%s AND endBan <= %s",
+    "timers.cleanup": "DELETE FROM timers WHERE user_id=%s AND ban=false AND mute=false",
+    # Warnings, kicks and bans
+    "warn_user.all": "SELECT user_id, warnings, kicks, bans, tag FROM warn_user ORDER BY user_id",
+    "warn_user.by_user": "SELECT user_id, warnings, kicks, bans, tag FROM warn_user WHERE user_id=%s",
+    "warn_user.add_warning": """INSERT INTO warn_user (user_id, warnings, kicks, bans, tag)
+        VALUES (%s, 1, 0, 0, %s)
+        ON DUPLICATE KEY UPDATE warnings = warnings + 1, tag = VALUES(tag)""",
+    "warn_user.add_kick": """INSERT INTO warn_user (user_id, warnings, kicks, bans, tag)
+        VALUES (%s, 0, 1, 0, %s)
+        ON DUPLICATE KEY UPDATE kicks = kicks + 1, tag = VALUES(tag)""",
+    "warn_user.add_ban": """INSERT INTO warn_user (user_id, warnings, kicks, bans, tag)
+        VALUES (%s, 0, 0, 1, %s)
+        ON DUPLICATE KEY UPDATE bans = bans + 1, tag = VALUES(tag)""",
+    "warn_user.del_warning": "UPDATE warn_user SET warnings = GREATEST(warnings - 1, 0) WHERE user_id=%s",
+    "warn_user.del_kick": "UPDATE warn_user SET kicks = GREATEST(kicks - 1, 0) WHERE user_id=%s",
+    "warn_user.del_ban": "UPDATE warn_user SET bans = GREATEST(bans - 1, 0) WHERE user_id=%s",
+    "warn_reasons.by_user": "SELECT id, reason FROM warn_reasons WHERE user_id=%s ORDER BY id DESC",
+    "warn_reasons.page_first": "SELECT id, reason FROM warn_reasons WHERE user_id=%s ORDER BY id DESC LIMIT %s",
+    "warn_reasons.page": "SELECT id, reason FROM warn_reasons WHERE user_id=%s AND id < %s ORDER BY id DESC LIMIT %s",
+    "warn_reasons.count": "SELECT COUNT(*) AS warning_count FROM warn_reasons WHERE reason=%s AND user_id=%s",
+    "warn_reasons.add": "INSERT INTO warn_reasons (user_id, reason) VALUES (%s, %s)",
+    "warn_reasons.del": "DELETE FROM warn_reasons WHERE reason=%s AND user_id=%s",
+    # Kill board
+    "kill_board.total": "SELECT COALESCE(SUM(counter), 0) AS total FROM kill_board",
+    "kill_board.by_user": "SELECT user_id, counter FROM kill_board WHERE user_id=%s",
+    "kill_board.leaders": "SELECT user_id, counter FROM kill_board ORDER BY counter DESC LIMIT %s",
+    "kill_board.del": "DELETE FROM kill_board WHERE user_id=%s",
+    "kill_board.decrement": "UPDATE kill_board SET counter = counter - %s WHERE user_id=%s",
+    # Reviews
+    "reviews.add": """INSERT INTO reviews (message_id, kind, user_id, data)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE kind=VALUES(kind), user_id=VALUES(user_id), data=VALUES(data)""",
+    "reviews.get": "SELECT message_id, kind, user_id, data FROM reviews WHERE message_id=%s",
+    "reviews.del": "DELETE FROM reviews WHERE message_id=%s",
+}
+
+
+# --- Query Instrumentation ---
+# Upper bounds, in milliseconds, of the latency histogram buckets
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# All but the last "(%s, %s), " row of a multi-row VALUES list
+_ROW_GROUPS = re.compile(r"(\((?:%s, )*%s\), )+")
+
+
+def _params_shape(params):
+    """Describes parameters by type only, values may be personal data."""
+    if params is None:
+        return "()"
+    return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+
+
+class _Histogram:
+    """Call count, errors and latency distribution of one statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1) # last one is overflow
+
+    def add(self, elapsed_ms, failed=False):
+        self.count += 1
+        self.errors += failed
+        self.total += elapsed_ms
+        self.max = max(self.max, elapsed_ms)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, elapsed_ms)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls."""
+        rank = fraction * self.count
+        seen = 0
+        for bound, hits in zip(LATENCY_BUCKETS, self.buckets):
+            seen += hits
+            if hits and seen >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': self.total,
+            'avg_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max,
+        }
+
+
+class QueryStats:
+    """Per-statement timings, call and error counts, and pool wait times.
+
+    Registered statements are keyed by name, raw SQL by its first words.
+    Statements slower than slow_ms are logged with the shape of their
+    parameters. Thread-safe, queries run on the AsyncDatabase workers.
+    """
+
+    def __init__(self, slow_ms=DB_SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._queries = {} # statement key -> _Histogram
+        self._pool_wait = _Histogram()
+        self.since = time.time()
+
+    @staticmethod
+    def key(statement):
+        if statement in STATEMENTS:
+            return statement
+        # Multi-row inserts share one key whatever their number of rows
+        return _ROW_GROUPS.sub("", " ".join(statement.split()))[:60]
+
+    def record(self, statement, params, elapsed, failed=False):
+        """Records one execution, elapsed in seconds."""
+        key = self.key(statement)
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            histogram = self._queries.get(key)
+            if histogram is None:
+                histogram = self._queries[key] = _Histogram()
+            histogram.add(elapsed_ms, failed)
+        if elapsed_ms >= self.slow_ms:
+            log.warning(f"Slow query ({elapsed_ms:.1f}ms) [{key}] params {_params_shape(params)}")
+
+    def record_wait(self, elapsed, failed=False):
+        """Records the time spent waiting for a pooled connection, in seconds."""
+        with self._lock:
+            self._pool_wait.add(elapsed * 1000, failed)
+
+    def snapshot(self):
+        """Returns the stats of every statement, and of the pool wait under 'pool_wait'."""
+        with self._lock:
+            queries = {key: histogram.snapshot() for key, histogram in self._queries.items()}
+            pool_wait = self._pool_wait.snapshot()
+        return {'since': self.since, 'queries': queries, 'pool_wait': pool_wait}
+
+    def reset(self):
+        with self._lock:
+            self._queries = {}
+            self._pool_wait = _Histogram()
+            self.since = time.time()
+
+    def summary(self, limit=10):
+        """Returns a text table of the statements taking the most total time."""
+        stats = self.snapshot()
+        queries = sorted(stats['queries'].items(), key=lambda item: item[1]['total_ms'], reverse=True)
+        wait = stats['pool_wait']
+        minutes = (time.time() - stats['since']) / 60
+        lines = [
+            f"Over {minutes:.0f} min, pool wait: {wait['count']} acquisitions, "
+            f"{wait['errors']} failed, p95 {wait['p95_ms']:.0f}ms, max {wait['max_ms']:.1f}ms",
+            f"{'statement':<28} {'calls':>7} {'err':>4} {'total ms':>9} {'avg':>6} {'p95':>5} {'max':>7}",
+        ]
+        for key, query in queries[:limit]:
+            lines.append(
+                f"{key[:28]:<28} {query['count']:>7} {query['errors']:>4} {query['total_ms']:>9.0f} "
+                f"{query['avg_ms']:>6.1f} {query['p95_ms']:>5.0f} {query['max_ms']:>7.1f}")
+        if len(queries) > limit:
+            lines.append(f"... {len(queries) - limit} more statements")
+        return "\n".join(lines)
+
+
+class _Transaction:
+    """Statements executed on a single pooled connection, see Database._transaction."""
+
+    def __init__(self, database, conn):
+        self._db = database
+        self.conn = conn
+        self.last = ""
+        self._cursors = []
+
+    def execute(self, statement, params=None):
+        """Executes a registered statement, by name, or raw SQL. Returns the cursor."""
+        self.last = statement
+        if statement in STATEMENTS:
+            cursor = self._db._prepared(self.conn, statement)
+            sql = STATEMENTS[statement]
+        else:
+            cursor = self.conn.cursor(dictionary=True)
+            self._cursors.append(cursor)
+            sql = statement
+
+        start = time.perf_counter()
+        try:
+            cursor.execute(sql, params)
+        except mariadb.Error:
+            self._db.stats.record(statement, params, time.perf_counter() - start, failed=True)
+            raise
+        self._db.stats.record(statement, params, time.perf_counter() - start)
+        return cursor
+
+    def close(self):
+        """Closes the cursors of raw SQL, prepared ones stay open for reuse."""
+        for cursor in self._cursors:
+            try: cursor.close()
+            except mariadb.Error: pass
+
+
+# --- JAC Cache ---
+class JacCache:
+    """In-memory index of the jac table.
+
+    Entries are kept in hash maps keyed by user_id and by invite link, plus a
+    heap ordered by post date for expiry, so the join-a-clan check is an O(1)
+    lookup with no database round trip.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._users = {} # user_id -> set of links
+        self._links = {} # link -> set of user_ids
+        self._dates = {} # (user_id, link) -> date
+        self._heap = [] # (date, user_id, link), may hold stale entries
+
+    def load(self, rows):
+        """Replace the cache content with rows from the jac table."""
+        with self._lock:
+            self._users.clear()
+            self._links.clear()
+            self._dates.clear()
+            self._heap = []
+            for row in rows or []:
+                date = self._add(row['user_id'], row['link'], row['date'])
+                if date is not None:
+                    self._heap.append((date, row['user_id'], row['link']))
+            heapq.heapify(self._heap)
+            self.loaded = True
+
+    def add(self, user_id: str, link: str, date):
+        """Index a new jac entry."""
+        with self._lock:
+            date = self._add(user_id, link, date)
+            if date is not None:
+                heapq.heappush(self._heap, (date, user_id, link))
+
+    def _add(self, user_id, link, date):
+        if isinstance(date, str):
+            try:
+                date = datetime.strptime(date, DATE_FORMAT)
+            except ValueError:
+                log.warning("Unparsable JAC date '%s' for user %s", date, user_id)
+                date = None
+        self._users.setdefault(user_id, set()).add(link)
+        self._links.setdefault(link, set()).add(user_id)
+        self._dates[(user_id, link)] = date
+        return date
+
+    def remove_user(self, user_id: str):
+        """Drop every entry of a user, heap entries are discarded lazily."""
+        with self._lock:
+            for link in list(self._users.get(user_id, ())):
+                self._remove(user_id, link)
+
+    def _remove(self, user_id, link):
+        self._dates.pop((user_id, link), None)
+        links = self._users.get(user_id)
+        if links is not None:
+            links.discard(link)
+            if not links:
+                del self._users[user_id]
+        users = self._links.get(link)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del self._links[link]
+
+    def has_user(self, user_id: str) -> bool:
+        return user_id in self._users
+
+    def has_link(self, link: str) -> bool:
+        return link in self._links
+
+    def expire(self, cutoff: datetime):
+        """Remove entries posted before cutoff and return how many were removed."""
+        expired = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] < cutoff:
+                date, user_id, link = heapq.heappop(self._heap)
+                # Skip heap entries already removed or re-added later
+                if self._dates.get((user_id, link)) != date:
+                    continue
+                self._remove(user_id, link)
+                expired += 1
+        return expired
+
+
+# --- Warnings Cache ---
+class WarnCache:
+    """Read-through cache of warn_user rows and reason counts, per user.
+
+    Filled on read, users without infractions included, and invalidated by
+    every write to the user's infractions. A read that started before an
+    invalidation is not stored, so a slow read never brings back stale data.
+    Least recently used users are dropped past maxsize.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._users = OrderedDict() # user_id -> {'row': row or _MISSING, 'counts': {reason: count}}
+        self._generation = 0 # bumped by each invalidation
+
+    def generation(self):
+        """Returns the token to pass to store_* for a read starting now."""
+        return self._generation
+
+    def _entry(self, user_id):
+        entry = self._users.get(user_id)
+        if entry is not None:
+            self._users.move_to_end(user_id)
+        return entry
+
+    def _store(self, user_id, generation):
+        """Returns the entry to fill, None if the read is outdated."""
+        if generation != self._generation:
+            return None
+        entry = self._entry(user_id)
+        if entry is None:
+            entry = self._users[user_id] = {'row': self._MISSING, 'counts': {}}
+            while len(self._users) > self.maxsize:
+                self._users.popitem(last=False)
+        return entry
+
+    def get_row(self, user_id):
+        """Returns (hit, row), row is None for a user without infractions."""
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry is None or entry['row'] is self._MISSING:
+                return False, None
+            row = entry['row']
+            return True, dict(row) if row is not None else None
+
+    def store_row(self, user_id, generation, row):
+        with self._lock:
+            entry = self._store(user_id, generation)
+            if entry is not None:
+                entry['row'] = dict(row) if row is not None else None
+
+    def get_count(self, user_id, reason):
+        """Returns the cached count of a reason, None if not cached."""
+        with self._lock:
+            entry = self._entry(user_id)
+            return entry['counts'].get(reason) if entry is not None else None
+
+    def store_count(self, user_id, generation, reason, count):
+        with self._lock:
+            entry = self._store(user_id, generation)
+            if entry is not None:
+                entry['counts'][reason] = count
+
+    def invalidate(self, user_id):
+        """Drops what is cached for a user, called on every write."""
+        with self._lock:
+            self._generation += 1
+            self._users.pop(user_id, None)
+
+
 # --- Database Class ---
 class Database(commands.Cog):
 
     # REMOVED: Module/Class level conn and cur variables
     # REMOVED: Initial connection attempt here
 
-    def __init__(self, bot):
+    def __init__(self, bot, pool=None):
         self.bot = bot
+        self.pool = pool or create_pool()
+        self.acquire_timeout = DB_POOL_TIMEOUT
+        # Pool exhaustion metrics
+        self.pool_exhausted = 0 # Acquisitions that found no idle connection
+        self.pool_timeouts = 0 # Acquisitions that gave up after acquire_timeout
+        self.jac = JacCache()
+        self.warns = WarnCache()
+        # Kill counter write-behind buffer, user_id -> kills not yet written
+        self._kill_lock = threading.Lock()
+        self._kill_buffer = {}
+        self._kill_pending = 0
+        self._kill_total = None # Cached sum of kill_board, None until first read
+        # Held by kill_board writes, odd _kill_generation while one is in flight
+        self._kill_write_lock = threading.Lock()
+        self._kill_generation = 0
+        self.stats = QueryStats()
         # You could potentially test the pool connection here once if desired
         # self._test_pool_connection()
         log.info("Database Cog initialized, using connection pool '%s'", POOL_CONFIG['pool_name'])
 
     def _get_connection(self):
-        """Gets a connection from the pool."""
-        try:
-            # The connector handles getting a connection from the named pool
-            # using the configuration provided when the pool was likely first implicitly created.
-            # It's important that mariadb.connect is called with these pool args somewhere,
-            # often just implicitly by the first request for a pooled connection.
-            # For safety, we can pass the config each time, though it should reuse the named pool.
-            conn = mariadb.connect(**POOL_CONFIG)
-            # log.debug("Acquired connection from pool '%s'.", POOL_CONFIG['pool_name'])
-            return conn
-        except mariadb.Error as e:
-            log.error(f"Error getting connection from pool '{POOL_CONFIG['pool_name']}': {e}", exc_info=True)
-            raise # Re-raise the exception to be handled by the calling method
+        """Gets a connection from the pool, growing it or waiting up to acquire_timeout."""
+        global _pool_growing
+        start = time.monotonic()
+        deadline = start + self.acquire_timeout
+        waited = False
+        while True:
+            with _pool_available:
+                returned = _pool_returned
+            try:
+                conn = self.pool.get_connection()
+                if conn is not None:
+                    self.stats.record_wait(time.monotonic() - start)
+                    return conn
+            except mariadb.PoolError:
+                pass
+
+            if not waited:
+                waited = True
+                self.pool_exhausted += 1
+
+            # Grow the pool up to pool_size before waiting on busy connections,
+            # only the right to grow is taken under the lock
+            with _pool_available:
+                grow = self.pool.connection_count + _pool_growing < self.pool.pool_size
+                if grow:
+                    _pool_growing += 1
+            if grow:
+                try:
+                    self.pool.add_connection(mariadb.connect(**CONNECTION_CONFIG))
+                    continue
+                except mariadb.Error as e:
+                    log.error(f"Error growing pool '{POOL_CONFIG['pool_name']}': {e}", exc_info=True)
+                    self.stats.record_wait(time.monotonic() - start, failed=True)
+                    raise
+                finally:
+                    with _pool_available:
+                        _pool_growing -= 1
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.pool_timeouts += 1
+                self.stats.record_wait(time.monotonic() - start, failed=True)
+                log.warning("Pool '%s' exhausted, no connection within %.1fs",
+                            POOL_CONFIG['pool_name'], self.acquire_timeout)
+                raise mariadb.PoolError(
+                    f"No connection available in pool '{POOL_CONFIG['pool_name']}' "
+                    f"after {self.acquire_timeout}s")
+            # Woken by _release_connection, unless a connection already came back
+            with _pool_available:
+                _pool_available.wait_for(lambda: _pool_returned != returned, remaining)
+
+    def _release_connection(self, conn):
+        """Returns a connection to the pool and wakes one waiting acquisition."""
+        global _pool_returned
+        try: conn.close()
+        except mariadb.Error: pass
+        with _pool_available:
+            _pool_returned += 1
+            _pool_available.notify()
+
+    def pool_stats(self):
+        """Returns a snapshot of pool size and exhaustion counters."""
+        return {
+            'size': self.pool.connection_count,
+            'max_size': self.pool.pool_size,
+            'exhausted': self.pool_exhausted,
+            'timeouts': self.pool_timeouts,
+        }
 
     def _test_pool_connection(self):
         """Optional: Test pool connection on init."""
@@ -110,23 +764,113 @@ class Database(commands.Cog):
             # Depending on bot structure, might want to sys.exit or raise specific error
         finally:
             if conn:
-                try: conn.close()
-                except: pass
+                self._release_connection(conn)
+
+    def _prepared(self, conn, name):
+        """Returns the prepared cursor of a registered statement on a connection.
+
+        The cursors are kept on the connection itself, used by one thread at
+        a time, so they go away with it when the pool replaces or closes it.
+        They belong to the server session they were prepared on: a connection
+        reconnected by the pool has a new connection_id and prepares them again.
+        """
+        session = conn.connection_id
+        cached = getattr(conn, "_prepared_statements", None)
+        if cached is None or cached[0] != session:
+            if cached is not None:
+                self._forget_prepared(conn)
+            cached = conn._prepared_statements = (session, {})
+        statements = cached[1]
+        cursor = statements.get(name)
+        if cursor is None:
+            cursor = statements[name] = conn.cursor(prepared=True, dictionary=True)
+        return cursor
+
+    def _forget_prepared(self, conn):
+        """Drops the prepared cursors of a connection, prepared again on next use."""
+        cached = getattr(conn, "_prepared_statements", None)
+        if cached is not None:
+            conn._prepared_statements = None
+            for cursor in cached[1].values():
+                try: cursor.close()
+                except mariadb.Error: pass
+
+    @contextmanager
+    def _transaction(self, commit=True):
+        """Runs statements on one pooled connection as a single transaction.
+
+        Commits when the block completes, or only ends the transaction when
+        commit is False. Rolls back and re-raises on database errors, and
+        always returns the connection to the pool.
+        """
+        conn = self._get_connection()
+        tx = _Transaction(self, conn)
+        try:
+            yield tx
+            if commit:
+                conn.commit()
+            else:
+                # Connections are not reset when returned to the pool,
+                # don't leave a read snapshot open on them
+                conn.rollback()
+        except mariadb.Error as db_error:
+            log.exception(f"Database error executing [{tx.last[:100]}...]: {db_error}", exc_info=True)
+            try:
+                conn.rollback()
+                log.warning("Transaction rolled back due to error.")
+            except mariadb.Error as rb_error:
+                log.error(f"Error during rollback: {rb_error}", exc_info=True)
+            # The connection may be broken, prepare its statements again
+            self._forget_prepared(conn)
+            raise
+        finally:
+            tx.close()
+            self._release_connection(conn) # IMPORTANT: Return connection to pool
 
     # --- Refactored Database Methods ---
 
-    ### JAC DATABASE ###
+    ### SCHEMA ###
+    def migrate(self):
+        """Applies the pending schema migrations. Returns the schema version.
+
+        MariaDB commits DDL implicitly, so a failed version is not rolled
+        back; its steps are safe to run again once the cause is fixed.
+        """
+        with self._transaction() as tx:
+            tx.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+                version INT NOT NULL PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )""")
+            current = tx.execute(
+                "SELECT COALESCE(MAX(version), 0) AS version FROM schema_version"
+            ).fetchone()['version']
+
+            for version, description, steps in MIGRATIONS:
+                if version <= current:
+                    continue
+                log.info(f"Applying schema migration {version}: {description}")
+                for step in steps:
+                    if callable(step):
+                        step(tx)
+                        continue
+                    statement, params = step if isinstance(step, tuple) else (step, None)
+                    tx.execute(statement, params)
+                tx.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (version, description))
+                tx.conn.commit()
+                current = version
+
+        log.info(f"Database schema at version {current}")
+        return current
+
     def _execute_query(self, query, params=None, fetch=None, commit=False):
-        """Helper method to execute queries using the connection pool."""
-        conn = None
-        cursor = None
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor(dictionary=True) # Use dictionary cursor
-            cursor.execute(query, params)
+        """Helper method to execute a registered statement, by name, or raw SQL."""
+        with self._transaction(commit=commit) as tx:
+            cursor = tx.execute(query, params)
 
             if commit:
-                conn.commit()
                 log.debug(f"Query committed: {query[:100]}...") # Log snippet
                 return cursor.rowcount # Return row count for modifications
 
@@ -134,112 +878,161 @@ class Database(commands.Cog):
                 return cursor.fetchone()
             elif fetch == 'all':
                 return cursor.fetchall()
-            else: # No fetch needed, and commit was false (likely SELECT without fetch?)
-                 # Or could be an uncommitted write if commit=False was intentional
-                return None # Or raise error if state is unexpected
-
-        except mariadb.Error as db_error:
-            log.exception(f"Database error executing query [{query[:100]}...]: {db_error}", exc_info=True)
-            # Rollback on error if it was intended to be a transaction
-            if conn and commit:
-                try:
-                    conn.rollback()
-                    log.warning("Transaction rolled back due to error.")
-                except mariadb.Error as rb_error:
-                    log.error(f"Error during rollback: {rb_error}", exc_info=True)
-            raise # Re-raise the exception to be handled by caller
-        finally:
-            if cursor:
-                try: cursor.close()
-                except mariadb.Error: pass
-            if conn:
-                try: conn.close() # IMPORTANT: Return connection to pool
-                except mariadb.Error: pass
-                # log.debug("Returned connection to pool.")
+            return None
 
+    ### JAC DATABASE ###
     def getJac(self):
         """Retrieves all JAC entries."""
-        statement = "SELECT user_id, link, date FROM jac ORDER BY user_id DESC"
-        return self._execute_query(statement, fetch='all')
+        return self._execute_query("jac.all", fetch='all')
 
     def getJacByID(self, user_id: str):
         """Retrieves JAC entries for a specific user_id."""
-        statement = "SELECT user_id, link, date FROM jac WHERE user_id=%s"
-        return self._execute_query(statement, params=(user_id,), fetch='all')
+        return self._execute_query("jac.by_user", params=(user_id,), fetch='all')
 
-    def addJac(self, user_id: str, link: str, date: str):
+    def loadJac(self):
+        """Loads the whole jac table into the in-memory JAC cache."""
+        self.jac.load(self.getJac())
+        log.info("JAC cache loaded")
+        return self.jac
+
+    def addJac(self, user_id: str, link: str, date: datetime):
         """Adds a new entry to the jac table."""
-        statement = "INSERT INTO jac (user_id, link, date) VALUES (%s, %s, %s)"
-        return self._execute_query(statement, params=(user_id, link, date), commit=True)
+        date = to_datetime(date)
+        result = self._execute_query("jac.add", params=(user_id, link, date), commit=True)
+        if self.jac.loaded:
+            self.jac.add(user_id, link, date)
+        return result
 
     def delJac(self, user_id: str):
         """Deletes all JAC entries for a specific user_id."""
-        statement = "DELETE FROM jac WHERE user_id=%s"
-        return self._execute_query(statement, params=(user_id,), commit=True)
+        result = self._execute_query("jac.del", params=(user_id,), commit=True)
+        self.jac.remove_user(user_id)
+        return result
+
+    def expireJac(self, retention_days: int = 14, batch_size: int = 1000):
+        """Deletes the JAC entries older than retention_days. Returns the number of rows deleted.
+
+        Rows are deleted in batches of batch_size, each in its own transaction,
+        so a large backlog never holds the table locked for long.
+        """
+        # Dates are stored naive in the bot's timezone, NOW() is the server's
+        cutoff = datetime.now(TZ).replace(tzinfo=None) - timedelta(days=retention_days)
+
+        deleted = 0
+        while True:
+            count = self._execute_query("jac.expire", params=(cutoff, batch_size), commit=True)
+            deleted += count
+            if count < batch_size:
+                break
+
+        self.jac.expire(cutoff)
+        if deleted:
+            log.info(f"Expired {deleted} JAC entries older than {retention_days} days")
+        return deleted
 
     def getLink(self, link: str):
         """Retrieves user_id and link for a specific link."""
-        statement = "SELECT user_id, link FROM jac WHERE link=%s"
         # Fetch only one, assuming link is unique or we only care about the first match
-        return self._execute_query(statement, params=(link,), fetch='one')
+        return self._execute_query("jac.by_link", params=(link,), fetch='one')
 
     ### TIMERS DATABASE ###
-    def addTimerMute(self, user_id: str, endMute: str):
+    def addTimerMute(self, user_id: str, endMute: datetime):
         """Adds or updates a mute timer for a user."""
-        # Using NULL for empty date fields is generally better than empty strings ''
-        statement = """INSERT INTO timers (user_id, ban, mute, endBan, endMute)
-        VALUES (%s, false, true, NULL, %s)
-        ON DUPLICATE KEY UPDATE mute=true, endMute=%s"""
-        return self._execute_query(statement, params=(user_id, endMute, endMute), commit=True)
+        endMute = to_datetime(endMute)
+        return self._execute_query("timers.mute", params=(user_id, endMute, endMute), commit=True)
 
-    def addTimerBan(self, user_id: str, endBan: str):
+    def addTimerBan(self, user_id: str, endBan: datetime):
         """Adds or updates a ban timer for a user."""
-        statement = """INSERT INTO timers (user_id, ban, mute, endBan, endMute)
-        VALUES (%s, true, false, %s, NULL)
-        ON DUPLICATE KEY UPDATE ban=true, endBan=%s"""
-        return self._execute_query(statement, params=(user_id, endBan, endBan), commit=True)
+        endBan = to_datetime(endBan)
+        return self._execute_query("timers.ban", params=(user_id, endBan, endBan), commit=True)
 
     def getTimers(self):
         """Retrieves all active timers."""
-        # Select specific columns and filter for active timers
-        statement = "SELECT user_id, ban, mute, endBan, endMute FROM timers WHERE ban=true OR mute=true"
-        return self._execute_query(statement, fetch='all')
+        return self._execute_query("timers.active", fetch='all')
+
+    def getTimersPage(self, after_user_id: str = None, limit: int = 10):
+        """Retrieves up to limit active timers ordered by user_id, after after_user_id."""
+        if after_user_id is None:
+            return self._execute_query("timers.page_first", params=(limit,), fetch='all')
+        return self._execute_query("timers.page", params=(after_user_id, limit), fetch='all')
+
+    def getDueTimers(self, until: datetime):
+        """Retrieves the active timers with a mute or ban ending before until."""
+        until = to_datetime(until)
+        return self._execute_query("timers.due", params=(until, until), fetch='all')
 
     def delTimer(self, user_id):
         """Deletes all timer entries for a specific user."""
-        statement = "DELETE FROM timers WHERE user_id=%s"
-        return self._execute_query(statement, params=(user_id,), commit=True)
+        return self._execute_query("timers.del", params=(user_id,), commit=True)
+
+    def delTimerMute(self, user_id: str, ended: datetime = None):
+        """Clears the mute timer of a user, removing the row if no timer is left.
+
+        With ended, only a timer ending by then is cleared, so a mute set
+        again while the previous one expired is kept.
+        """
+        if ended is None:
+            return self._clear_timer(user_id, "timers.clear_mute", (user_id,))
+        return self._clear_timer(user_id, "timers.clear_mute_ended", (user_id, to_datetime(ended)))
+
+    def delTimerBan(self, user_id: str, ended: datetime = None):
+        """Clears the ban timer of a user, removing the row if no timer is left.
+
+        With ended, only a timer ending by then is cleared, see delTimerMute.
+        """
+        if ended is None:
+            return self._clear_timer(user_id, "timers.clear_ban", (user_id,))
+        return self._clear_timer(user_id, "timers.clear_ban_ended", (user_id, to_datetime(ended)))
+
+    def _clear_timer(self, user_id, clear_statement, params):
+        with self._transaction() as tx:
+            cleared = tx.execute(clear_statement, params).rowcount
+            tx.execute("timers.cleanup", (user_id,))
+        log.debug(f"Timer cleared for user {user_id}")
+        return cleared
 
     ### WARNINGS DATABASE ###
     def getWarnUsers(self):
         """Retrieves summary data for all users with infractions."""
-        statement = "SELECT user_id, warnings, kicks, bans, tag FROM warn_user ORDER BY user_id"
-        return self._execute_query(statement, fetch='all')
+        return self._execute_query("warn_user.all", fetch='all')
 
     def getWarnUserByID(self, user_id: str):
-        """Retrieves summary data for a specific user."""
-        statement = "SELECT user_id, warnings, kicks, bans, tag FROM warn_user WHERE user_id=%s"
+        """Retrieves summary data for a specific user, None if the user has no infractions."""
+        hit, row = self.warns.get_row(user_id)
+        if hit:
+            return row
+        generation = self.warns.generation()
         # Use fetch one as user_id should be unique in warn_user
-        return self._execute_query(statement, params=(user_id,), fetch='one')
+        row = self._execute_query("warn_user.by_user", params=(user_id,), fetch='one')
+        self.warns.store_row(user_id, generation, row)
+        return row
 
     def getWarnReasons(self, user_id: str):
         """Retrieves all warning reasons for a specific user."""
-        statement = "SELECT id, reason FROM warn_reasons WHERE user_id=%s ORDER BY id DESC"
-        return self._execute_query(statement, params=(user_id,), fetch='all')
+        return self._execute_query("warn_reasons.by_user", params=(user_id,), fetch='all')
+
+    def getWarnReasonsPage(self, user_id: str, before_id: int = None, limit: int = 15):
+        """Retrieves up to limit warning reasons of a user, newest first, older than before_id."""
+        if before_id is None:
+            return self._execute_query("warn_reasons.page_first", params=(user_id, limit), fetch='all')
+        return self._execute_query("warn_reasons.page", params=(user_id, before_id, limit), fetch='all')
 
     def getWarnCount(self, user_id: str, reason: str):
+        """Counts the infractions of a user stored with exactly this reason."""
+        count = self.warns.get_count(user_id, reason)
+        if count is not None:
+            return count
+        generation = self.warns.generation()
         try:
-            # Use SQL COUNT(*) to get the count directly from the database
-            statement = "SELECT COUNT(*) AS warning_count FROM warn_reasons WHERE reason=%s AND user_id=%s"
-            data = (reason, user_id)
-
             # fetch='one' will return a single row (as a dictionary due to dictionary=True)
             # In this case, the dictionary will look like {'warning_count': count}
-            result_row = self._execute_query(statement, params=data, fetch='one')
+            result_row = self._execute_query("warn_reasons.count", params=(reason, user_id), fetch='one')
 
             if result_row is not None:
                 # Extract the count from the dictionary
-                return result_row.get('warning_count', 0) # Use .get for safety
+                count = result_row.get('warning_count', 0) # Use .get for safety
+                self.warns.store_count(user_id, generation, reason, count)
+                return count
             else:
                 # This case should theoretically not happen with COUNT(*),
                 # but good practice to handle.
@@ -254,297 +1047,275 @@ class Database(commands.Cog):
             log.exception("Unexpected error in getWarnCount: %s", e)
             return 0
 
-    def addWarning(self, user_id: str, tag:str, reason: str):
-        """Adds a warning reason and increments the warning count for a user."""
-        # Use INSERT ... ON DUPLICATE KEY UPDATE for atomicity
-        user_update_statement = """
-            INSERT INTO warn_user (user_id, warnings, kicks, bans, tag)
-            VALUES (%s, 1, 0, 0, %s)
-            ON DUPLICATE KEY UPDATE warnings = warnings + 1, tag = VALUES(tag)
-        """
-        reason_insert_statement = "INSERT INTO warn_reasons (user_id, reason) VALUES (%s, %s)"
-
-        conn = None
-        cursor = None
+    def _add_infraction(self, counter_statement, user_id, tag, reason):
+        """Stores a reason and increments one counter of warn_user in a single transaction."""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor(dictionary=True)
-
-            # Execute both statements within a transaction
-            cursor.execute(user_update_statement, (user_id, tag))
-            cursor.execute(reason_insert_statement, (user_id, reason))
-
-            conn.commit() # Commit both changes together
-            log.debug(f"Warning added for user {user_id}")
-            return cursor.rowcount # Indicate success
-        except mariadb.Error as db_error:
-            log.exception(f"Database error adding warning for user {user_id}: {db_error}", exc_info=True)
-            if conn:
-                try: conn.rollback()
-                except mariadb.Error: pass
-            raise
+            with self._transaction() as tx:
+                tx.execute(counter_statement, (user_id, tag))
+                cursor = tx.execute("warn_reasons.add", (user_id, reason))
         finally:
-            if cursor:
-                try: cursor.close()
-                except mariadb.Error: pass
-            if conn:
-                try: conn.close()
-                except mariadb.Error: pass
-
-    def delWarning(self, user_id: str, reason: str):
-        """Deletes a specific warning reason by its ID and decrements count."""
-        # It's much safer to delete by a unique ID than by reason text
-        reason_delete_statement = "DELETE FROM warn_reasons WHERE reason=%s AND user_id=%s"
-        user_update_statement = "UPDATE warn_user SET warnings = GREATEST(warnings - 1, 0) WHERE user_id=%s"
+            self.warns.invalidate(user_id)
+        return cursor.rowcount
 
-        conn = None
-        cursor = None
+    def _del_infraction(self, counter_statement, user_id, reason):
+        """Deletes a reason and decrements one counter of warn_user if it existed."""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor(dictionary=True)
-
-            # Execute both statements within a transaction
-            cursor.execute(reason_delete_statement, (reason, user_id))
-            deleted_count = cursor.rowcount # Check if the reason was actually deleted
+            with self._transaction() as tx:
+                deleted_count = tx.execute("warn_reasons.del", (reason, user_id)).rowcount
+                if deleted_count > 0:
+                    tx.execute(counter_statement, (user_id,))
+        finally:
+            self.warns.invalidate(user_id)
+        return deleted_count
 
-            if deleted_count > 0:
-                cursor.execute(user_update_statement, (user_id,))
-                conn.commit() # Commit both changes together
-                log.debug(f"Warning reason '{reason}' deleted for user {user_id}")
-                return deleted_count
-            else:
-                log.warning(f"Warning reason '{reason}' not found for user {user_id}. No changes made.")
-                conn.rollback() # Rollback if reason wasn't found
-                return 0
+    def addWarning(self, user_id: str, tag:str, reason: str):
+        """Adds a warning reason and increments the warning count for a user."""
+        result = self._add_infraction("warn_user.add_warning", user_id, tag, reason)
+        log.debug(f"Warning added for user {user_id}")
+        return result
 
-        except mariadb.Error as db_error:
-            log.exception(f"Database error deleting warning reason '{reason}' for user {user_id}: {db_error}", exc_info=True)
-            if conn:
-                try: conn.rollback()
-                except mariadb.Error: pass
-            raise
-        finally:
-            if cursor:
-                try: cursor.close()
-                except mariadb.Error: pass
-            if conn:
-                try: conn.close()
-                except mariadb.Error: pass
+    def delWarning(self, user_id: str, reason: str):
+        """Deletes a warning reason and decrements the warning count."""
+        deleted_count = self._del_infraction("warn_user.del_warning", user_id, reason)
+        if deleted_count > 0:
+            log.debug(f"Warning reason '{reason}' deleted for user {user_id}")
+        else:
+            log.warning(f"Warning reason '{reason}' not found for user {user_id}. No changes made.")
+        return deleted_count
 
     ### KICKS DATABASE ###
     # Assuming kicks/bans also just add a reason and update the counter atomically
     def addKick(self, user_id: str, tag:str, reason: str):
         """Adds a kick reason and increments the kick count for a user."""
-        user_update_statement = """
-            INSERT INTO warn_user (user_id, warnings, kicks, bans, tag)
-            VALUES (%s, 0, 1, 0, %s)
-            ON DUPLICATE KEY UPDATE kicks = kicks + 1, tag = VALUES(tag)
-        """
-        reason_insert_statement = "INSERT INTO warn_reasons (user_id, reason) VALUES (%s, %s)"
-        conn = None
-        cursor = None
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(user_update_statement, (user_id, tag))
-            cursor.execute(reason_insert_statement, (user_id, reason))
-            conn.commit()
-            log.debug(f"Kick added for user {user_id}")
-            return cursor.rowcount
-        except mariadb.Error as db_error:
-            log.exception(f"Database error adding kick for user {user_id}: {db_error}", exc_info=True)
-            if conn:
-                try: conn.rollback()
-                except: pass
-            raise
-        finally:
-            if cursor:
-                try: cursor.close()
-                except: pass
-            if conn:
-                try: conn.close()
-                except: pass
-
+        result = self._add_infraction("warn_user.add_kick", user_id, tag, reason)
+        log.debug(f"Kick added for user {user_id}")
+        return result
 
     def delKick(self, user_id: str, reason: str):
-        """Deletes a specific kick reason by its ID and decrements count."""
-        reason_delete_statement = "DELETE FROM warn_reasons WHERE reason=%s AND user_id=%s"
-        user_update_statement = "UPDATE warn_user SET kicks = GREATEST(kicks - 1, 0) WHERE user_id=%s"
-
-        conn = None
-        cursor = None
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(reason_delete_statement, (reason, user_id))
-            deleted_count = cursor.rowcount
-            if deleted_count > 0:
-                cursor.execute(user_update_statement, (user_id,))
-                conn.commit()
-                log.debug(f"Kick reason '{reason}' deleted for user {user_id}")
-                return deleted_count
-            else:
-                log.warning(f"Kick reason '{reason}' not found for user {user_id}.")
-                conn.rollback()
-                return 0
-        except mariadb.Error as db_error:
-            log.exception(f"Database error deleting kick reason '{reason}' for user {user_id}: {db_error}", exc_info=True)
-            if conn:
-                try: conn.rollback()
-                except: pass
-            raise
-        finally:
-            if cursor:
-                try: cursor.close()
-                except: pass
-            if conn:
-                try: conn.close()
-                except: pass
+        """Deletes a kick reason and decrements the kick count."""
+        deleted_count = self._del_infraction("warn_user.del_kick", user_id, reason)
+        if deleted_count > 0:
+            log.debug(f"Kick reason '{reason}' deleted for user {user_id}")
+        else:
+            log.warning(f"Kick reason '{reason}' not found for user {user_id}.")
+        return deleted_count
 
     ### BANS DATABASE ###
     def addBan(self, user_id: str, tag:str, reason: str):
         """Adds a ban reason and increments the ban count for a user."""
-        user_update_statement = """
-            INSERT INTO warn_user (user_id, warnings, kicks, bans, tag)
-            VALUES (%s, 0, 0, 1, %s)
-            ON DUPLICATE KEY UPDATE bans = bans + 1, tag = VALUES(tag)
-        """
-        reason_insert_statement = "INSERT INTO warn_reasons (user_id, reason) VALUES (%s, %s)"
-
-        conn = None
-        cursor = None
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(user_update_statement, (user_id, tag))
-            cursor.execute(reason_insert_statement, (user_id, reason))
-            conn.commit()
-            log.debug(f"Ban added for user {user_id}")
-            return cursor.rowcount
-        except mariadb.Error as db_error:
-            log.exception(f"Database error adding ban for user {user_id}: {db_error}", exc_info=True)
-            if conn:
-                try: conn.rollback()
-                except: pass
-            raise
-        finally:
-            if cursor:
-                try: cursor.close()
-                except: pass
-            if conn:
-                try: conn.close()
-                except: pass
+        result = self._add_infraction("warn_user.add_ban", user_id, tag, reason)
+        log.debug(f"Ban added for user {user_id}")
+        return result
 
     def delBan(self, user_id: str, reason: str):
-        """Deletes a specific ban reason by its ID and decrements count."""
-        reason_delete_statement = "DELETE FROM warn_reasons WHERE id=%s AND user_id=%s"
-        user_update_statement = "UPDATE warn_user SET bans = GREATEST(bans - 1, 0) WHERE user_id=%s"
-        conn = None
-        cursor = None
-        try:
-            conn = self._get_connection()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(reason_delete_statement, (reason, user_id))
-            deleted_count = cursor.rowcount
-            if deleted_count > 0:
-                cursor.execute(user_update_statement, (user_id,))
-                conn.commit()
-                log.debug(f"Ban reason '{reason}' deleted for user {user_id}")
-                return deleted_count
-            else:
-                log.warning(f"Ban reason '{reason}' not found for user {user_id}.")
-                conn.rollback()
-                return 0
-        except mariadb.Error as db_error:
-            log.exception(f"Database error deleting ban reason '{reason}' for user {user_id}: {db_error}", exc_info=True)
-            if conn:
-                try: conn.rollback()
-                except: pass
-            raise
-        finally:
-            if cursor:
-                try: cursor.close()
-                except: pass
-            if conn:
-                try: conn.close()
-                except: pass
-
+        """Deletes a ban reason and decrements the ban count."""
+        deleted_count = self._del_infraction("warn_user.del_ban", user_id, reason)
+        if deleted_count > 0:
+            log.debug(f"Ban reason '{reason}' deleted for user {user_id}")
+        else:
+            log.warning(f"Ban reason '{reason}' not found for user {user_id}.")
+        return deleted_count
 
     ### KILL BOARD DATABASE ###
+    def _read_kill_board(self, query, params, consume):
+        """Runs a kill_board read and returns consume(row), called under _kill_lock.
+
+        Kills stay buffered until their flush commits, so the row and the
+        buffer agree when no write started or finished during the read:
+        _kill_generation is then unchanged and even. Otherwise the read is
+        run again, holding off the writers.
+        """
+        with self._kill_lock:
+            generation = self._kill_generation
+        if generation % 2 == 0:
+            result = self._execute_query(query, params=params, fetch='one')
+            with self._kill_lock:
+                if generation == self._kill_generation:
+                    return consume(result)
+
+        with self._kill_write_lock:
+            result = self._execute_query(query, params=params, fetch='one')
+            with self._kill_lock:
+                return consume(result)
+
     def getKillCount(self, user_id: str):
-        """Gets total kill count for all users or a specific user."""
+        """Gets total kill count for all users or a specific user, including buffered kills."""
         if user_id == "*":
-            statement = "SELECT user_id, counter FROM kill_board"
-            results = self._execute_query(statement, fetch='all')
-            total_counter = sum(item['counter'] for item in results) if results else 0
-            # log.info(f"Total kill count: {total_counter}")
-            return total_counter
-        else:
-            statement = "SELECT user_id, counter FROM kill_board WHERE user_id=%s"
-            result = self._execute_query(statement, params=(user_id,), fetch='one')
-            count = result['counter'] if result else 0
-            # log.info(f"Kill count for user {user_id}: {count}")
-            return count
+            # The total is summed once, then kept up to date by the write path
+            with self._kill_lock:
+                if self._kill_total is not None:
+                    return self._kill_total + sum(self._kill_buffer.values())
+
+            def total(result):
+                self._kill_total = int(result['total']) if result else 0
+                return self._kill_total + sum(self._kill_buffer.values())
+            return self._read_kill_board("kill_board.total", None, total)
+
+        def count(result):
+            return (result['counter'] if result else 0) + self._kill_buffer.get(user_id, 0)
+        return self._read_kill_board("kill_board.by_user", (user_id,), count)
 
     def addKillCount(self, user_id: str):
-        """Increments kill count for a user, adding them if they don't exist."""
-        statement = """
-            INSERT INTO kill_board (user_id, counter) VALUES (%s, 1)
-            ON DUPLICATE KEY UPDATE counter = counter + 1
+        """Buffers a kill for a user. Returns the number of kills buffered since the last flush.
+
+        Kills are written by flushKillCounts, periodically or once the buffer
+        reaches DB_KILL_FLUSH_SIZE.
         """
-        return self._execute_query(statement, params=(user_id,), commit=True)
+        with self._kill_lock:
+            self._kill_buffer[user_id] = self._kill_buffer.get(user_id, 0) + 1
+            self._kill_pending += 1
+            return self._kill_pending
+
+    def flushKillCounts(self):
+        """Writes the buffered kills in a single statement. Returns the number of users written."""
+        with self._kill_write_lock:
+            with self._kill_lock:
+                if not self._kill_buffer:
+                    return 0
+                # Kills stay buffered until written, for the readers
+                counts = dict(self._kill_buffer)
+                pending, self._kill_pending = self._kill_pending, 0
+                self._kill_generation += 1
+
+            # The row count varies, so this one is sent as plain SQL
+            rows = ", ".join(["(%s, %s)"] * len(counts))
+            statement = f"""
+                INSERT INTO kill_board (user_id, counter) VALUES {rows}
+                ON DUPLICATE KEY UPDATE counter = counter + VALUES(counter)
+            """
+            params = tuple(value for item in counts.items() for value in item)
+            written = False
+            try:
+                self._execute_query(statement, params=params, commit=True)
+                written = True
+            finally:
+                with self._kill_lock:
+                    if written:
+                        for user_id, count in counts.items():
+                            left = self._kill_buffer[user_id] - count
+                            if left:
+                                self._kill_buffer[user_id] = left
+                            else:
+                                del self._kill_buffer[user_id]
+                        if self._kill_total is not None:
+                            self._kill_total += sum(counts.values())
+                    else:
+                        # Still buffered, retried on the next flush
+                        self._kill_pending += pending
+                    self._kill_generation += 1
+        log.debug(f"Flushed kill counts for {len(counts)} users")
+        return len(counts)
+
+    def getKillLeaders(self, limit: int = 10):
+        """Gets the users with the highest kill count, highest first."""
+        # Rank buffered kills too
+        self.flushKillCounts()
+        return self._execute_query("kill_board.leaders", params=(limit,), fetch='all') or []
 
     def delKillCount(self, user_id: str, amount: int):
         """Deletes user or decrements kill count by amount."""
-        if amount == 0: # Special case: delete user entirely
-            statement = "DELETE FROM kill_board WHERE user_id=%s"
-            return self._execute_query(statement, params=(user_id,), commit=True)
-        elif amount > 0:
-            # Need to handle this carefully to avoid negative counts within a transaction
-            conn = None
-            cursor = None
+        # Buffered kills must be written first, or they would be added back afterwards
+        self.flushKillCounts()
+        if amount < 0:
+            log.error(f"Invalid amount ({amount}) passed to delKillCount for user {user_id}.")
+            return 0
+
+        with self._kill_write_lock:
+            with self._kill_lock:
+                self._kill_generation += 1
             try:
-                conn = self._get_connection()
-                cursor = conn.cursor(dictionary=True)
+                return self._del_kill_count(user_id, amount)
+            finally:
+                # Committed or rolled back, the total is summed again on the next read
+                with self._kill_lock:
+                    self._kill_total = None
+                    self._kill_generation += 1
 
-                # Lock row for update (optional, depends on concurrency needs)
-                # cursor.execute("SELECT counter FROM kill_board WHERE user_id=%s FOR UPDATE", (user_id,))
-                cursor.execute("SELECT counter FROM kill_board WHERE user_id=%s", (user_id,))
-                result = cursor.fetchone()
+    def _del_kill_count(self, user_id: str, amount: int):
+        """Deletes user (amount 0) or decrements kill count, see delKillCount."""
+        if amount == 0: # Special case: delete user entirely
+            return self._execute_query("kill_board.del", params=(user_id,), commit=True)
+        else:
+            # Need to handle this carefully to avoid negative counts within a transaction
+            with self._transaction() as tx:
+                result = tx.execute("kill_board.by_user", (user_id,)).fetchone()
 
                 if result:
                     current_count = result['counter']
                     if current_count - amount < 0:
                         log.warning(f"Attempt to reduce kill count below zero for user {user_id}. Deleting user instead.")
                         # Fall through to delete if amount would make it negative
-                        cursor.execute("DELETE FROM kill_board WHERE user_id=%s", (user_id,))
+                        cursor = tx.execute("kill_board.del", (user_id,))
                     else:
-                        cursor.execute("UPDATE kill_board SET counter = counter - %s WHERE user_id=%s", (amount, user_id))
-                    conn.commit()
+                        cursor = tx.execute("kill_board.decrement", (amount, user_id))
                     return cursor.rowcount
                 else:
                     log.warning(f"User {user_id} not found in kill_board for deletion/decrement.")
                     return 0 # User not found
 
-            except mariadb.Error as db_error:
-                log.exception(f"Error reducing kill counter for user {user_id}: {db_error}", exc_info=True)
-                if conn:
-                    try: conn.rollback()
-                    except: pass
-                raise
-            finally:
-                if cursor:
-                    try: cursor.close()
-                    except: pass
-                if conn:
-                    try: conn.close()
-                    except: pass
-        else: # amount < 0
-            log.error(f"Invalid amount ({amount}) passed to delKillCount for user {user_id}.")
-            return 0
+    ### REVIEWS DATABASE ###
+    def addReview(self, message_id: str, kind: str, user_id: str, data: dict = None):
+        """Stores the state of a pending review, keyed by the message holding its buttons."""
+        params = (message_id, kind, user_id, json.dumps(data or {}))
+        return self._execute_query("reviews.add", params=params, commit=True)
+
+    def getReview(self, message_id: str):
+        """Retrieves a pending review by message ID, with its data decoded. None if not found."""
+        review = self._execute_query("reviews.get", params=(message_id,), fetch='one')
+        if review is not None:
+            review['data'] = json.loads(review['data']) if review['data'] else {}
+        return review
+
+    def delReview(self, message_id: str):
+        """Deletes a review once it has been handled. Returns the number of rows deleted."""
+        return self._execute_query("reviews.del", params=(message_id,), commit=True)
+
+
+# --- Async Facade ---
+class AsyncDatabase:
+    """Awaitable wrapper around a Database instance.
+
+    Every public Database method is exposed under the same name as a coroutine
+    function. The blocking mariadb call runs on a dedicated thread pool sized
+    like the connection pool, so a slow query never stalls the gateway loop.
+    """
+
+    def __init__(self, database, max_workers=None):
+        self._db = database
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or POOL_CONFIG['pool_size'],
+            thread_name_prefix="db")
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def run_in_executor(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(attr, *args, **kwargs))
+
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, name, run_in_executor)
+        return run_in_executor
+
+    async def addKillCount(self, user_id: str):
+        """Buffer a kill without leaving the event loop, flush once the buffer is full."""
+        if self._db.addKillCount(user_id) >= DB_KILL_FLUSH_SIZE:
+            await self.flushKillCounts()
+
+    def close(self):
+        """Wait for pending queries, write buffered kills and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+        try:
+            self._db.flushKillCounts()
+        except mariadb.Error:
+            log.exception("Unable to write buffered kill counts on shutdown")
 
 
 def setup(bot):
     """Add cog to the bot."""
-    bot.add_cog(Database(bot))
+    bot.add_cog(Database(bot, create_pool()))
 
@@ -1,36 +1,17 @@
 # pylint: disable=F0401, W0702, W0703, W0105, W0613
 # pyright: reportMissingImports=false, reportMissingModuleSource=false
-import re
-import logging
-from logging.handlers import RotatingFileHandler
 from datetime import datetime, timedelta
 import pytz
 import discord
 from discord.ext import commands
 import config
+import logsetup
 import support
-import cogs.database as db
+import filters
 
 
 #Setup module logging
-log = logging.getLogger(__name__)
-log.setLevel(logging.INFO)
-
-log_formatter = logging.Formatter("%(name)s - %(asctime)s:%(levelname)s: %(message)s")
-
-file_handler = RotatingFileHandler(
-    filename=f"logs/{__name__}.log",
-    mode="a",
-    maxBytes=20000,
-    backupCount=5,
-    encoding="utf-8")
-file_handler.setFormatter(log_formatter)
-
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(log_formatter)
-
-log.addHandler(file_handler)
-log.addHandler(console_handler)
+log = logsetup.get_logger(__name__)
 
 
 tz_TX = pytz.timezone("US/Central")
@@ -50,7 +31,7 @@ class Events(commands.Cog):
     def __init__(self, bot):
         """Initialize Events cog."""
         self.bot = bot
-        self.database = db.Database(self.bot)
+        self.database = bot.database
 
 
     @commands.Cog.listener()
@@ -70,20 +51,13 @@ class Events(commands.Cog):
 
         # Add ban log to DB
         if ban_entry.reason is None:
-            self.database.addBan(str(user.id), str(user), "Ban: No reason Specified")
+            await self.database.addBan(str(user.id), str(user), "Ban: No reason Specified")
         else:
-            self.database.addBan(str(user.id), str(user), ban_entry.reason)
+            await self.database.addBan(str(user.id), str(user), ban_entry.reason)
 
-        author = None
-
-        # Read audit logs
-        # For whatever reason it does not assign the author of the ban and logs "None"
-        async for entry in guild.audit_logs(limit=1, action=discord.AuditLogAction.ban):
-            if entry.target.id == user.id:
-                author = entry.user
-
-        # Add 'unban' button under each ban embed
-        unban_button = support.Unban()
+        # Get who issued the ban from the audit log
+        entry = await self.bot.auditlog.wait_for(discord.AuditLogAction.ban, user.id)
+        author = entry.user if entry is not None else None
 
         # Create embed to log the banning
         embed = discord.Embed(
@@ -95,35 +69,12 @@ class Events(commands.Cog):
         embed.add_field(name="Reason", value=ban_entry.reason, inline=False)
         embed.add_field(name="Timestamp", value=dt)
 
-        channel = guild.get_channel(config.LOG_CHAN)
-
-        await channel.send(embed=embed, view=unban_button)
-
-        # Wait for button press on embed
-        await unban_button.wait()
-
-        # Respond to button press
-        if unban_button.value:
-
-            await guild.unban(user)
-
-            # Remove ban from db
-            self.database.delBan(str(user.id), ban_entry.reason)
-
-            # Edit ban log embed to reflect
-            new_embed = discord.Embed(
-                title="User ban - canceled",
-                description=f"User {user.name}#{user.discriminator} was unbanned by {unban_button.user}",
-                colour=config.GREEN,
-            )
-            new_embed.set_author(
-                name=self.bot.user.name, icon_url=self.bot.user.avatar.url
-            )
-            new_embed.add_field(name="Ban reason", value=ban_entry.reason, inline=False)
-            new_embed.add_field(name="Timestamp", value=now.strftime(TIME_FORMAT))
-            await unban_button.inter.edit_original_message(
-                embed=new_embed, view=None
-            )
+        # Add 'unban' button under each ban embed, handled by support.UnbanReview
+        log_msg = await self.bot.modlog.send(embed, view=support.UnbanReview())
+        await support.store_review(
+            self.database, log_msg, support.REVIEW_UNBAN, str(user.id),
+            {"name": f"{user.name}#{user.discriminator}", "reason": ban_entry.reason},
+        )
 
     # But there is no on_member_kick. oof
     @commands.Cog.listener()
@@ -138,33 +89,30 @@ class Events(commands.Cog):
         now = datetime.now(tz_TX)
         dt = now.strftime(TIME_FORMAT)
 
-        guild = member.guild
-
-        author = None
-
-        # Check if latest entry is actually a kick log
-        async for entry in guild.audit_logs(
-            limit=1, action=discord.AuditLogAction.kick
-        ):
-            if entry.target == member:
-                author = entry.user
-
-                embed = discord.Embed(
-                    title="User Kick",
-                    description=f"User {member.name}#{member.discriminator} was kicked from the server by {author}.",
-                    colour=config.RED,
-                )
-                embed.set_author(
-                    name=self.bot.user.name, icon_url=self.bot.user.avatar.url
-                )
-                embed.add_field(name="Reason", value=entry.reason)
-                embed.add_field(name="Timestamp", value=dt)
+        # Check if the member left because of a kick, most leaves are not
+        # kicks so don't hold on to them for the full audit log timeout
+        entry = await self.bot.auditlog.wait_for(
+            discord.AuditLogAction.kick, member.id,
+            timeout=getattr(config, "AUDITLOG_KICK_TIMEOUT", 2),
+        )
+        if entry is None:
+            return
+        author = entry.user
 
-                channel = guild.get_channel(config.LOG_CHAN)
+        embed = discord.Embed(
+            title="User Kick",
+            description=f"User {member.name}#{member.discriminator} was kicked from the server by {author}.",
+            colour=config.RED,
+        )
+        embed.set_author(
+            name=self.bot.user.name, icon_url=self.bot.user.avatar.url
+        )
+        embed.add_field(name="Reason", value=entry.reason)
+        embed.add_field(name="Timestamp", value=dt)
 
-                await channel.send(content=None, embed=embed)
+        self.bot.modlog.post(embed)
 
-                self.database.addKick(str(member.id), str(member.name), entry.reason)
+        await self.database.addKick(str(member.id), str(member.name), entry.reason)
 
     # When a member gets timed out, this should be called
     @commands.Cog.listener()
@@ -178,38 +126,27 @@ class Events(commands.Cog):
 
         now = datetime.now(tz_TX)
         dt = now.strftime(TIME_FORMAT)
-        guild = after.guild
 
         # If timed_out from false -> true
         if not before.timed_out and after.timed_out:
 
-            # Get last entry of audit log that's a member update
-            async for entry in guild.audit_logs(
-                limit=1, action=discord.AuditLogAction.member_update
-            ):
-                # Check if it's the same user of the invoked event
-                if entry.target == after:
-                    # Get who caused the update
-                    author = entry.user
-                else: author = None
-
-                # Create button to undo timeout
-                undo_button = support.Untimeout()
-
-                channel = guild.get_channel(config.LOG_CHAN)
-                await channel.send(
-                    embed=support.timeout_embed(
-                        self.bot, after, author, entry.reason
-                    ),
-                    view=undo_button
-                )
-
-                # Wait for button press on embed
-                await undo_button.wait()
-
-                # Respond to button press
-                if undo_button.value:
-                    await after.remove_timeout(reason="Timeout removed")
+            # Get the member update entry that set the timeout
+            entry = await self.bot.auditlog.wait_for(
+                discord.AuditLogAction.member_update,
+                after.id,
+                check=lambda e: getattr(e.after, "communication_disabled_until", None) is not None,
+            )
+            author = entry.user if entry is not None else None
+            reason = entry.reason if entry is not None else None
+
+            # Log with a button to undo the timeout, handled by support.UntimeoutReview
+            log_msg = await self.bot.modlog.send(
+                support.timeout_embed(
+                    self.bot, after, author, reason
+                ),
+                view=support.UntimeoutReview()
+            )
+            await support.store_review(self.database, log_msg, support.REVIEW_UNTIMEOUT, str(after.id))
 
 
         # If timed_out from true -> false
@@ -224,8 +161,7 @@ class Events(commands.Cog):
             )
             embed.add_field(name="Timestamp", value = dt)
 
-            channel = guild.get_channel(config.LOG_CHAN)
-            await channel.send(embed=embed)
+            self.bot.modlog.post(embed)
 
 
     @commands.Cog.listener()
@@ -247,68 +183,73 @@ class Events(commands.Cog):
             )
             return
 
-        await check_invites(self, message)
-        if not await check_spam_v2(self, message):
-            await check_scam(self, message)
-        await check_jac(self, message)
-        await check_blacklist(self, message)
-        await check_msg_link(self, message)
+        # Scan the message once against every word list in config.py
+        # and extract its URLs, invites and message links for all the checks
+        analysis = filters.MessageAnalysis(message.content, feed=self.bot.scamfeed)
+
+        await check_invites(self, message, analysis)
+        if not await check_spam_v2(self, message, analysis):
+            await check_scam(self, message, analysis)
+        await check_jac(self, message, analysis)
+        await check_blacklist(self, message, analysis)
+        await check_msg_link(self, message, analysis)
 
 
 def setup(bot):
     """Add cog to the bot."""
     bot.add_cog(Events(bot))
 
-async def check_spam_v2(self, message) -> bool:
+async def check_spam_v2(self, message, analysis) -> bool:
     """Detects if a message has the typical scam format of @everyone and a link. Excludes admins and mods."""
     admin_role = message.guild.get_role(config.ADMIN_ID)
     mod_role = message.guild.get_role(config.MOD_ID)
 
     # Spam / phishing filtering
-    scam_link = re.search(r"(?P<url>https?://[^\s]+)", message.content)
+    scam_link = analysis.url
 
     # if not admin or mod and message is typical spam, block and notify
     if admin_role in message.author.roles or mod_role in message.author.roles:
         return False
 
-    if scam_link is not None and "@everyone" in message.content:
+    if scam_link is not None and analysis.everyone:
 
         # Remove spam message
         try:
             await message.delete()
             # Add to kill counter
-            self.database.addKillCount(str(message.author.id))
+            await self.database.addKillCount(str(message.author.id))
 
         except Exception as err:
             log.error("Unable to delete spam message: %s", err)
 
-        if scam_link.group("url") not in config.SCAM:
+        # Report each URL once while it is tracked
+        if await self.bot.scams.add_url(scam_link):
             log.info("Possible spam detected: %s", message.content)
 
-            # Add the URL to the temporary SCAM list in config.py
-            config.SCAM.append(scam_link.group("url"))
-
-            # Append the author ID to the SCAM_USER list in config.py
-            config.SCAM_USER.append(message.author.id)
+            # Track the author too, until the review is done
+            await self.bot.scams.add_user(message.author.id)
 
             # Send embed for moderators in the mod log channel
-            await scam_check_embed(self, message, scam_link.group("url"))
+            await scam_check_embed(self, message, scam_link, analysis)
+        else:
+            await join_incident(self, message, analysis)
         return True
-    elif scam_link is None and ("@everyone" in message.content or "@here" in message.content):
-        if any(x in message.content for x in config.NSFW):
+    elif scam_link is None and (analysis.everyone or analysis.here):
+        if "nsfw" in analysis.matches:
             try:
                 log.info("Possible NSFW spam detected: %s", message.content)
-                await scam_check_embed(self, message, "NSFW spam with no link")
+                await scam_check_embed(self, message, "NSFW spam with no link", analysis)
             except Exception as exc:
                 log.error("NSFW Spam filter error: %s", exc)
     return False
 
-async def check_jac(self, message):
+async def check_jac(self, message, analysis):
     """Check posts inside the Join-A-Clan channel to find duplicates within the time limit.
 
     Keyword arguments:
-    self    -- self reference of the bot
-    message -- message to check
+    self     -- self reference of the bot
+    message  -- message to check
+    analysis -- content analysis of the message
 
     If a message in the config.CLAN_CHAN channel is sent from the same user or contains the
     same discord invite URL within the span of 14 days, intercept the message and warn the
@@ -325,11 +266,12 @@ async def check_jac(self, message):
         if botrole in message.author.roles:
             return
         # Save entries in JAC db, check if existence
+        # Lookups go through the in-memory JAC index, no DB round trip
+        jac = self.database.jac
+        if not jac.loaded:
+            await self.database.loadJac()
 
-        jac = self.database.getJac()
-        #warn_users = self.database.getWarnUsers()
-
-        if str(message.author.id) in map(lambda x: x['user_id'], jac):
+        if jac.has_user(str(message.author.id)):
 
             # DB logging happens within function
             await issue_warn(
@@ -339,19 +281,16 @@ async def check_jac(self, message):
             )
             await message.delete()
             # Add to kill counter
-            self.database.addKillCount(str(message.author.id))
+            await self.database.addKillCount(str(message.author.id))
 
         else:
-            # Regexp the link
-            link = re.search(r"(?P<url>[https?://]*discord.gg/[^\s]+)", message.content)
-
-            if link is None:
+            if not analysis.invites:
                 link = "No link posted"
             else:
-                link = link.group("url")
+                link = analysis.invites[0]
 
                 # Check if link already in db
-                if link in map(lambda x: x['link'], jac):
+                if jac.has_link(link):
 
                     # Issue warning as link already exists
                     await issue_warn(
@@ -361,64 +300,66 @@ async def check_jac(self, message):
                     )
                     await message.delete()
                     # Add to kill counter
-                    self.database.addKillCount(str(message.author.id))
+                    await self.database.addKillCount(str(message.author.id))
                     return
 
             # Get timestamp
-            now = datetime.now(tz_TX)
-            date = now.strftime(TIME_FORMAT)
+            now = datetime.now(tz_TX).replace(tzinfo=None)
 
             # Add entry because wasn't there before
-            self.database.addJac(str(message.author.id), link, date)
+            await self.database.addJac(str(message.author.id), link, now)
 
 
-async def check_scam(self, message):
+async def check_scam(self, message, analysis):
     """Check each message to filter out possible scam or phishing URLs.
 
     Keyword arguments:
-    self    -- self reference of the bot
-    message -- message to check
+    self     -- self reference of the bot
+    message  -- message to check
+    analysis -- content analysis of the message
 
     Each message will be scanned to check either a known scam/phishing domain or
     suspicious text/phrases that were used by userbots to spread malicious URLs.
     """
-    # Spam / phishing filtering
-    scam_link = re.search(r"(?P<url>https?://[^\s]+)", message.content)
+    matches = analysis.matches
 
-    if scam_link is not None:
+    if analysis.urls:
 
-        # discord nitro scam, aggressive check
-        scam_msg = message.content.replace(scam_link.group("url"), "")
+        # discord nitro scam, aggressive check on the text around the URL
+        scam_link, url_span = analysis.urls[0]
 
-        if any(y in scam_msg.lower() for y in config.SCAMTEXT):
+        if matches.outside("scamtext", [url_span]):
             try:
 
                 await message.delete()
 
                 # Add to kill counter
-                self.database.addKillCount(str(message.author.id))
+                await self.database.addKillCount(str(message.author.id))
 
-                if scam_link.group("url") not in config.SCAM:
-                    config.SCAM.append(scam_link.group("url"))
+                if await self.bot.scams.add_url(scam_link):
                     log.info("Nitro scam blocked.")
-                    await scam_check_embed(self, message, scam_link.group("url"))
+                    await scam_check_embed(self, message, scam_link, analysis)
+                else:
+                    await join_incident(self, message, analysis)
 
             except:
                 log.exception("Message not found.")
 
-        # normal url scam check
-        if any(x in scam_link.group("url") for x in config.SCAMURLS):
+        # normal url scam check, on every URL of the message
+        if analysis.scam_urls:
+            scam_link = analysis.scam_urls[0]
             try:
 
                 await message.delete()
 
                 # Add to kill counter
-                self.database.addKillCount(str(message.author.id))
+                await self.database.addKillCount(str(message.author.id))
 
-                if scam_link.group("url") not in config.SCAM:
-                    config.SCAM.append(scam_link.group("url"))
+                if await self.bot.scams.add_url(scam_link):
                     log.info("General scam blocked.")
-                    await scam_check_embed(self, message, scam_link.group("url"))
+                    await scam_check_embed(self, message, scam_link, analysis)
+                else:
+                    await join_incident(self, message, analysis)
 
             except:
                 log.exception("Message not found.")
@@ -426,39 +367,62 @@ async def check_scam(self, message):
         # discord nitro scam, aggressive check pt.2
         scam_msg = message.content
 
-        if any(y in scam_msg.lower() for y in config.SCAMTEXT):
+        if "scamtext" in matches:
 
             await message.delete()
 
             # Add to kill counter
-            self.database.addKillCount(str(message.author.id))
+            await self.database.addKillCount(str(message.author.id))
 
-            if scam_msg not in config.SCAM:
-                config.SCAM.append(scam_msg)
+            if await self.bot.scams.add_url(scam_msg):
 
-                await scam_check_embed(self, message, scam_msg)
+                await scam_check_embed(self, message, scam_msg, analysis)
                 log.info("Nitro text scam blocked.")
+            else:
+                await join_incident(self, message, analysis)
 
 
-async def scam_check_embed(self, message, filtered_url):
+async def review_timeout(message):
+    """Temporarily timeout the author of a possible scam until it is reviewed."""
+    try:
+        await message.author.timeout_for(duration=timedelta(days=1),
+                                        reason="Temporary timeout for spam review")
+    except Exception as err:
+        log.error("Couldn't timeout user for spam review: %s", err)
+
+
+async def join_incident(self, message, analysis):
+    """Add the author of an already reported scam to the open review of its campaign, if any.
+
+    Keyword arguments:
+    self     -- self reference of the bot
+    message  -- message to check
+    analysis -- content analysis of the message
+    """
+    incident, _ = self.bot.incidents.track(analysis, None, message.author, open_new=False)
+    if incident is not None:
+        await review_timeout(message)
+
+
+async def scam_check_embed(self, message, filtered_url, analysis):
     """Generate an embed with buttons to manage possible scam or phishing messages.
 
     Keyword arguments:
     self         -- self reference of the bot
     message      --  message to check
     filtered_url -- URL that was filtered from the message
+    analysis     -- content analysis of the message
+
+    Copies of a message already under review, within the incident window,
+    are added to that review instead of getting their own.
     """
 
     # Temporarily timeout the message author
-    try:
-        await message.author.timeout_for(duration=timedelta(days=1),
-                                        reason="Temporary timeout for spam review")
-    except Exception as err:
-        log.error("Couldn't timeout user for spam review: %s", err)
+    await review_timeout(message)
 
-    # Define a list of two buttons that will be displayed under the embed
-    # add filtered_url to custom_id to avoid action on pre-existing buttons
-    ban_button = support.Scam(filtered_url)
+    incident, new = self.bot.incidents.track(analysis, filtered_url, message.author)
+    if not new:
+        return
 
     # Generate control embed in log channel
     embed = discord.Embed(
@@ -485,100 +449,38 @@ async def scam_check_embed(self, message, filtered_url):
     )
     embed.set_footer(text=config.FOOTER)
 
-    channel = message.guild.get_channel(config.LOG_CHAN)
-
-    await channel.send(embed=embed, view=ban_button)
-
-    # Wait for a mod to press a button
-    await ban_button.wait()
-
-    # If mod confirms ban
-    if ban_button.value:
-        log.info("Spam confirmed by %s", ban_button.user)
-        modrole = message.guild.get_role(config.MOD_ID)
-        if modrole not in message.author.roles:
-
-            new_embed = discord.Embed(
-                title="Possible scam - manual review completed",
-                description=f"Review of the blocked message was done by {ban_button.user}",
-                colour=config.GREEN,
-            )
-            new_embed.add_field(
-                name="Suspicious message", value=msg, inline=False
-            )
-            new_embed.add_field(name="Suspicious link", value=filtered_url)
-            new_embed.add_field(name="Author", value=message.author.mention)
-            new_embed.add_field(
-                name="Join date", value=message.author.joined_at.strftime(TIME_FORMAT)
-            )
-            new_embed.add_field(
-                name="Creation date",
-                value=message.author.created_at.strftime(TIME_FORMAT),
-            )
-
-            await ban_button.inter.message.edit(embed=new_embed, view=None)
-            await message.author.ban(
-                reason=f"Spam message confirmed by {ban_button.user}",
-                delete_message_seconds=43200, # 12 hours
-            )
-            try:
-                config.SCAM.remove(filtered_url)
-                config.SCAM_USER.remove(message.author.id)
-            except:
-                pass
-
-    # If mod cancels
-    else:
-        log.info("Spam negated by %s", ban_button.user)
-        new_embed = discord.Embed(
-            title="Possible scam - manual review completed",
-            description=f"Review of the blocked message was done by {ban_button.user}",
-            colour=config.GREEN,
-        )
-        new_embed.add_field(
-            name="Suspicious message", value=message.content, inline=False
-        )
-
-        filtered_url = (
-            (filtered_url[:1020] + "...")
-            if len(filtered_url) > 1024
-            else filtered_url
-            )
-
-        new_embed.add_field(name="Suspicious link", value=filtered_url)
-        new_embed.add_field(name="Author", value=message.author.mention)
-        new_embed.add_field(
-            name="Join date", value=message.author.joined_at.strftime(TIME_FORMAT)
-        )
-        new_embed.add_field(
-            name="Creation date", value=message.author.created_at.strftime(TIME_FORMAT)
+    # Ban and cancel buttons are handled by support.ScamReview
+    try:
+        log_msg = await self.bot.modlog.send(embed, view=support.ScamReview())
+        await support.store_review(
+            self.database, log_msg, support.REVIEW_SCAM, str(message.author.id),
+            {"url": filtered_url, "users": [str(message.author.id)]},
         )
+    except Exception:
+        self.bot.incidents.drop(incident)
+        raise
+    # Joining authors are added to the stored review from now on
+    self.bot.incidents.set_review(incident, log_msg)
 
-        await ban_button.inter.message.edit(embed=new_embed, view=None)
-        try:
-            await message.author.remove_timeout(reason="Spam review completed. Timeout removed")
-            config.SCAM.remove(filtered_url)
-            config.SCAM_USER.remove(message.author.id)
-        except:
-            pass
-
-async def check_invites(self, message):
+async def check_invites(self, message, analysis):
     """Check each message for unauthorized discord invites.
 
     Keyword arguments:
-    self    -- self reference of the bot
-    message -- message to check
+    self     -- self reference of the bot
+    message  -- message to check
+    analysis -- content analysis of the message
 
     Perform a check on each message to intercept discord invites in any channel that
     is not config.CLAN_CHAN and warn the user who posted it. If the URL is in
     config.INVITE_WHITELIST, the message is ignored.
     """
-    if "discord.gg/" in message.content or "discord.com/" in message.content or "discordapp.com/invite" in message.content:
+    matches = analysis.matches
+    if "invite" in matches:
         #Stop if link is to another channel, maybe find a way to make this work better
-        if "discord.com/channels" in message.content:
+        if "channel_link" in matches:
             return
         # Check if in invite whitelist
-        if any(url in message.content for url in config.INVITE_WHITELIST):
+        if "whitelist" in matches:
             return
         else:
             mod_role = message.guild.get_role(config.MOD_ID)
@@ -594,31 +496,31 @@ async def check_invites(self, message):
                 await message.delete()
 
                 # Add to kill counter
-                self.database.addKillCount(str(message.author.id))
+                await self.database.addKillCount(str(message.author.id))
 
                 # Check if invite is in banlist - immediately ban
-                if any(url in message.content for url in config.INVITE_BANLIST):
+                if "banlist" in matches:
                     await message.author.ban(reason="Blacklisted invite")
                     return
 
 
                 # Testing: treat all invites as scams, don't log to channel
 
-                # extract URL with generic regex
-                message_url = re.search(r"(?P<url>https?://[^\s]+)", message.content)
-                if not message_url:
-                    # use a more specific regex
-                    message_url = re.search(r"(?P<url>(discord.gg|discord.com)/[^\s]+)", message.content)
+                # the first URL, or the first discord link without scheme
+                message_url = analysis.url
+                if not message_url and analysis.discord_urls:
+                    message_url = analysis.discord_urls[0]
 
                 if message_url:
-                    if message_url.group("url") not in config.SCAM:
-                        config.SCAM.append(message_url.group("url"))
+                    if await self.bot.scams.add_url(message_url):
                         log.info("General scam blocked.")
-                        await scam_check_embed(self, message, message_url.group("url"))
+                        await scam_check_embed(self, message, message_url, analysis)
+                    else:
+                        await join_incident(self, message, analysis)
                 else:
                     log.warning("No message_url extracted from regexp")
                     log.info("Possible scam blocked, no URL extracted")
-                    await scam_check_embed(self, message, "No url extracted")
+                    await scam_check_embed(self, message, "No url extracted", analysis)
 
 
                 # Commenting out the rest while testing
@@ -629,10 +531,10 @@ async def check_invites(self, message):
                 )
 
                 reason = f"User posted invite link in {message.channel}"
-                self.database.addWarning(str(message.author.id), str(message.author.name), reason)
+                await self.database.addWarning(str(message.author.id), str(message.author.name), reason)
 
                 # Check if user is spamming invites, done horribly
-                if self.database.getWarnCount(str(message.author.id), reason) >= 3:
+                if await self.database.getWarnCount(str(message.author.id), reason) >= 3:
                     await message.author.timeout_for(timedelta(days=1), reason="Too many invite warnings")
 
                 # Generate log embed
@@ -658,18 +560,19 @@ async def check_invites(self, message):
 
 
 
-async def check_blacklist(self, message):
+async def check_blacklist(self, message, analysis):
     """Check each message for blacklisted words.
 
     Keyword arguments:
-    self    -- self reference of the bot
-    message -- message to check
+    self     -- self reference of the bot
+    message  -- message to check
+    analysis -- content analysis of the message
 
     Perform a check on each message to intercept blacklisted words defined in
     config.BLACKLIST and warn user who posted any.
     """
     # Delete and warn for use of blacklisted (offensive, racist and all that) words
-    if any(word in message.content.lower() for word in config.BLACKLIST):
+    if "blacklist" in analysis.matches:
         role = message.guild.get_role(config.MOD_ID)
         if role in message.author.roles:
             pass
@@ -680,7 +583,7 @@ async def check_blacklist(self, message):
 
             reason = f"User sent prohibited word in {message.channel}"
 
-            self.database.addWarning(str(message.author.id), str(message.author.name), reason)
+            await self.database.addWarning(str(message.author.id), str(message.author.name), reason)
 
             # Generate log embed
             embed = discord.Embed(
@@ -698,40 +601,26 @@ async def check_blacklist(self, message):
             embed.add_field(name="Message:", value=msg, inline=False)
             embed.set_footer(text=config.FOOTER)
 
-            channel = message.guild.get_channel(config.LOG_CHAN)
-            await channel.send(content=None, embed=embed)
+            self.bot.modlog.post(embed)
             # Delete message
             await message.delete()
 
             # Add to kill counter
-            self.database.addKillCount(str(message.author.id))
+            await self.database.addKillCount(str(message.author.id))
 
 
-async def check_msg_link(self, message):
+async def check_msg_link(self, message, analysis):
     """Check if message contains a URL to another message in the same server and embed it.
 
     Keyword arguments:
-    self    -- self reference of the bot
-    message -- message to check
+    self     -- self reference of the bot
+    message  -- message to check
+    analysis -- content analysis of the message
     """
     # Embed the linked message showing content and author
-    if "discord.com/channels/" in message.content:
-        # Grab the link
-        link_reg = re.search(
-            r"(?P<url>[https?://]*discord.com/channels/[^\s]+)", message.content
-        )
-
-        if link_reg is None:
-            return
-
-        link_reg = link_reg.group("url")
-
-        # Split the link into its path components
-        link = link_reg.split("/")
-
-        # server_id = int(link[4])
-        channel_id = int(link[5])
-        message_id = int(link[6])
+    if analysis.message_links:
+        # server_id is the first of the link IDs
+        _, channel_id, message_id = analysis.message_links[0]
 
         channel = message.guild.get_channel(channel_id)
 
@@ -749,9 +638,6 @@ async def check_msg_link(self, message):
         if msg.attachments:
             embed.set_image(url=msg.attachments[0].url)
 
-        # Define remove button
-        remove_button = support.Remove()
-
         #embed.set_thumbnail(url=msg.author.avatar.url)
         embed.add_field(name="Channel", value=msg.channel)
         embed.add_field(
@@ -759,16 +645,9 @@ async def check_msg_link(self, message):
         )
         embed.set_footer(text=config.FOOTER)
 
-        # Reply with remove button
-        reply = await message.reply(embed=embed, view=remove_button)
-
-        await remove_button.wait()
-
-        # Manage remove button behaviour
-        role = message.guild.get_role(config.MOD_ID)
-
-        if remove_button.user == msg.author or role in remove_button.user.roles:
-            await reply.delete(reason="Poster removed embed")
+        # Reply with remove button, handled by support.RemoveReview
+        reply = await message.reply(embed=embed, view=support.RemoveReview())
+        await support.store_review(self.database, reply, support.REVIEW_REMOVE, str(msg.author.id))
 
 
 async def issue_warn(self, message, warning):
@@ -785,21 +664,21 @@ async def issue_warn(self, message, warning):
     # if the author is in the warnings database,
     # increase the relative warnings counter
 
-    warn_user = self.database.getWarnUsers()
+    warn_user = await self.database.getWarnUserByID(str(message.author.id))
 
-    if str(message.author.id) in map(lambda x: x['user_id'], warn_user):
+    if warn_user is not None:
 
-        self.database.addWarning(str(message.author.id), str(message.author.name), reason)
+        await self.database.addWarning(str(message.author.id), str(message.author.name), reason)
 
         # Check if multiple 14-days violation warnings
-        count = self.database.getWarnCount(str(message.author.id), reason)
+        count = await self.database.getWarnCount(str(message.author.id), reason)
 
         # If second violation, kick from the server
         # and notify user in DMs
         if count == 2 or count == 3:
             reason = "Kick: Multiple violations of 14-day rule in JAC"
 
-            self.database.addKick(str(message.author.id), str(message.author.name), reason)
+            await self.database.addKick(str(message.author.id), str(message.author.name), reason)
 
             try:
                 await message.author.send(
@@ -821,7 +700,7 @@ async def issue_warn(self, message, warning):
             return
 
     else:
-        self.database.addWarning(str(message.author.id), str(message.author), reason)
+        await self.database.addWarning(str(message.author.id), str(message.author), reason)
 
     # Generate log embed
     embed = discord.Embed(
@@ -832,5 +711,4 @@ async def issue_warn(self, message, warning):
     embed.add_field(name="Message:", value="{Clan Advertisment}", inline=False)
     embed.set_footer(text=config.FOOTER)
 
-    channel = message.guild.get_channel(config.LOG_CHAN)
-    await channel.send(content=None, embed=embed)
+    self.bot.modlog.post(embed)
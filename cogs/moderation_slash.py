@@ -2,42 +2,30 @@
 # pyright: reportMissingImports=false, reportMissingModuleSource=false
 import pytz
 from datetime import datetime, timedelta
-import re, asyncio
-import logging
-from logging.handlers import RotatingFileHandler
+import re
 import discord
 from discord.commands import slash_command, Option
 from discord.ext import commands
 import config
-import cogs.database as db
+import logsetup
+import scheduler
+import support
 
 
 #Setup module logging
-log = logging.getLogger(__name__)
-log.setLevel(logging.INFO)
+log = logsetup.get_logger(__name__)
 
-log_formatter = logging.Formatter("%(name)s - %(asctime)s:%(levelname)s: %(message)s")
-
-file_handler = RotatingFileHandler(
-    filename=f"logs/{__name__}.log",
-    mode="a",
-    maxBytes=20000,
-    backupCount=5,
-    encoding="utf-8")
-file_handler.setFormatter(log_formatter)
-
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(log_formatter)
-
-log.addHandler(file_handler)
-log.addHandler(console_handler)
+# Paging of /timers and /status, sized to stay within the embed description limit
+TIMERS_PER_PAGE = 10
+REASONS_PER_PAGE = 15
+REASON_MAX_CHARS = 200
 
 
 class ModerationSlash(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.database = db.Database(self.bot)
+        self.database = bot.database
 
     # /mute Command
     @slash_command(guild_ids=[config.GUILD], name="mute", default_permission=False)
@@ -49,7 +37,6 @@ class ModerationSlash(commands.Cog):
         duration: Option(str, "Duration of mute", required=False, default="a"),
     ):
         """Mute a selected member for an amount of time."""
-        channel = ctx.guild.get_channel(config.LOG_CHAN)
         role = ctx.guild.get_role(config.MUTE_ID)
 
         if "a" in duration:
@@ -74,13 +61,12 @@ class ModerationSlash(commands.Cog):
             embed.set_footer(text=config.FOOTER)
 
             # Log timeout in log channel
-            await channel.send(content=None, embed=embed)
+            self.bot.modlog.post(embed)
 
         else:
             tz_TX = pytz.timezone("US/Central")
             now = datetime.now(tz_TX)
             end = now
-            delta = timedelta(0)
             mods = re.findall(r"([0-9]+?[wdhms])+?", duration)
 
             if not mods:
@@ -92,32 +78,27 @@ class ModerationSlash(commands.Cog):
                 if "w" in x:
                     y = x[0:-1]
                     end = end + timedelta(weeks=int(y))
-                    delta = delta + timedelta(weeks=int(y))
                     dur = dur + y + " weeks "
                 elif "d" in x:
                     y = x[0:-1]
                     end = end + timedelta(days=int(y))
-                    delta = delta + timedelta(days=int(y))
                     dur = dur + y + " days "
                 elif "h" in x:
                     y = x[0:-1]
                     end = end + timedelta(hours=int(y))
-                    delta = delta + timedelta(hours=int(y))
                     dur = dur + y + " hours "
                 elif "m" in x:
                     y = x[0:-1]
                     end = end + timedelta(minutes=int(y))
-                    delta = delta + timedelta(minutes=int(y))
                     dur = dur + y + " minutes "
                 elif "s" in x:
                     y = x[0:-1]
                     end = end + timedelta(seconds=int(y))
-                    delta = delta + timedelta(seconds=int(y))
                     dur = dur + y + " seconds "
 
             end_string = end.strftime("%b-%d-%Y %H:%M:%S")
 
-            self.database.addTimerMute(str(member.id), end_string)
+            await self.database.addTimerMute(str(member.id), end)
 
             await member.add_roles(role)
 
@@ -141,22 +122,10 @@ class ModerationSlash(commands.Cog):
             embed.add_field(name="End:", value=end_string)
             embed.set_footer(text=config.FOOTER)
 
-            await channel.send(content=None, embed=embed)
-
-            await asyncio.sleep(int(delta.total_seconds()))
-            await member.remove_roles(role)
-            log.info("Timer ended - User %s has been unmuted", member)
+            self.bot.modlog.post(embed)
 
-            self.database.delTimer(str(member.id))
-
-            embed = discord.Embed(
-                title="Timed mute complete",
-                description=f"User {member.mention} has been unmuted automatically.",
-                colour=config.YELLOW,
-            )
-            embed.set_footer(text=config.FOOTER)
-
-            await channel.send(content=None, embed=embed)
+            # Unmuting is handled by the timer scheduler
+            self.bot.scheduler.schedule(member.id, scheduler.MUTE, end)
 
     # /unmute Command
     @slash_command(guild_ids=[config.GUILD], name="unmute", default_permission=False)
@@ -172,7 +141,8 @@ class ModerationSlash(commands.Cog):
             await member.remove_roles(role)
             log.info("User %s was unmuted", member)
 
-            self.database.delTimer(str(member.id))
+            self.bot.scheduler.cancel(member.id, scheduler.MUTE)
+            await self.database.delTimerMute(str(member.id))
 
             await ctx.respond(
                 embed=discord.Embed(
@@ -228,8 +198,7 @@ class ModerationSlash(commands.Cog):
                     colour=config.RED,
                 )
             )
-            channel = ctx.guild.get_channel(config.LOG_CHAN)
-            await channel.send(content=None, embed=embed)
+            self.bot.modlog.post(embed)
 
     # /tempban Command
     @slash_command(guild_ids=[config.GUILD], name="tempban", default_permission=False)
@@ -243,7 +212,6 @@ class ModerationSlash(commands.Cog):
     ):
         """Temporarily ban selected member from the server without deleting messages."""
         role = ctx.guild.get_role(config.MOD_ID)
-        channel = ctx.guild.get_channel(config.LOG_CHAN)
         mem = ctx.guild.get_member(member.id)
 
         if role in mem.roles:
@@ -256,7 +224,6 @@ class ModerationSlash(commands.Cog):
                 tz_TX = pytz.timezone("US/Central")
                 now = datetime.now(tz_TX)
                 end = now
-                delta = timedelta(0)
                 mods = re.findall(r"([0-9]+?[wdhms])+?", duration)
 
                 if not mods:
@@ -268,32 +235,27 @@ class ModerationSlash(commands.Cog):
                     if "w" in x:
                         y = x[0:-1]
                         end = end + timedelta(weeks=int(y))
-                        delta = delta + timedelta(weeks=int(y))
                         dur = dur + y + " weeks "
                     elif "d" in x:
                         y = x[0:-1]
                         end = end + timedelta(days=int(y))
-                        delta = delta + timedelta(days=int(y))
                         dur = dur + y + " days "
                     elif "h" in x:
                         y = x[0:-1]
                         end = end + timedelta(hours=int(y))
-                        delta = delta + timedelta(hours=int(y))
                         dur = dur + y + " hours "
                     elif "m" in x:
                         y = x[0:-1]
                         end = end + timedelta(minutes=int(y))
-                        delta = delta + timedelta(minutes=int(y))
                         dur = dur + y + " minutes "
                     elif "s" in x:
                         y = x[0:-1]
                         end = end + timedelta(seconds=int(y))
-                        delta = delta + timedelta(seconds=int(y))
                         dur = dur + y + " seconds "
 
                 end_string = end.strftime("%b-%d-%Y %H:%M:%S")
 
-                self.database.addTimerBan(str(member.id), end_string)
+                await self.database.addTimerBan(str(member.id), end)
 
                 dur = dur[0:-1]
                 embed = discord.Embed(
@@ -306,7 +268,7 @@ class ModerationSlash(commands.Cog):
                 embed.add_field(name="End:", value=end_string)
                 embed.set_footer(text=config.FOOTER)
 
-                await channel.send(content=None, embed=embed)
+                self.bot.modlog.post(embed)
 
                 await member.send(
                     f"You have ben temporarily banned from Drewski's Operators server. The ban lasts {dur}."
@@ -325,21 +287,8 @@ class ModerationSlash(commands.Cog):
                     )
                 )
 
-                await asyncio.sleep(int(delta.total_seconds()))
-
-                embed = discord.Embed(
-                    title="Timed ban complete",
-                    description=f"User {member.mention} has been unbanned automatically.",
-                    colour=config.YELLOW,
-                )
-                embed.set_footer(text=config.FOOTER)
-
-                await channel.send(content=None, embed=embed)
-                await ctx.guild.unban(member, reason="Temp ban concluded")
-
-                log.info("Timer ended - User %s has been unbanned.", member)
-
-                self.database.delTimer(str(member.id))
+                # Unbanning is handled by the timer scheduler
+                self.bot.scheduler.schedule(member.id, scheduler.BAN, end)
 
 
     # /kick Command
@@ -382,9 +331,12 @@ class ModerationSlash(commands.Cog):
         """Show the status summary of the selected user."""
         if user is not None:
 
-            user = await self.bot.fetch_user(user.id)
+            # Cached member or user first, the API only for unknown users
+            user = await self.bot.resolver.resolve(user.id) or user
             member = ctx.guild.get_member(user.id)
 
+            warn_user = await self.database.getWarnUserByID(str(user.id))
+
             if member is not None:
 
                 # Is nitro boosting
@@ -398,89 +350,71 @@ class ModerationSlash(commands.Cog):
                 role_mentions = [role.mention for role in roles]
                 role_list = ", ".join(role_mentions)
 
-                warn_reasons = self.database.getWarnReasons(str(member.id))
-                warn_user = self.database.getWarnUserByID(str(member.id))
-
-                if len(warn_user) > 0:
-                    embed = discord.Embed(
-                        title=f"Status of user {member}",
-                        description="\n".join(
-                            "{}: {}".format(*k)
-                            for k in enumerate(warn_reasons)
-                        ),
-                        colour=config.GREEN,
-                    )
-                    embed.add_field(name="Warnings:", value=warn_user['warnings'])
-                    embed.add_field(name="Kicks:", value=warn_user['kicks'])
-                    embed.add_field(name="Bans:", value=warn_user['bans'])
-                    embed.add_field(
-                        name="Joined:",
-                        value=member.joined_at.strftime("%b-%d-%Y %H:%M:%S"),
-                    )
-                    embed.add_field(
-                        name="Created:",
-                        value=member.created_at.strftime("%b-%d-%Y %H:%M:%S"),
-                    )
-                    embed.add_field(name="Boosting since", value=boosting, inline=False)
-                    embed.add_field(name="Roles", value=role_list, inline=False)
-                    embed.set_footer(text=config.FOOTER)
-                else:
-                    embed = discord.Embed(
-                        title=f"Status of user {member}",
-                        description="No warnings issued.",
-                        colour=config.GREEN,
-                    )
-                    embed.add_field(name="Warnings:", value="0")
-                    embed.add_field(name="Kicks:", value="0")
-                    embed.add_field(name="Bans:", value="0")
-                    embed.add_field(
-                        name="Joined:",
-                        value=member.joined_at.strftime("%b-%d-%Y %H:%M:%S"),
-                    )
-                    embed.add_field(
-                        name="Created:",
-                        value=member.created_at.strftime("%b-%d-%Y %H:%M:%S"),
-                    )
-                    embed.add_field(name="Boosting since", value=boosting, inline=False)
-                    embed.add_field(name="Roles", value=role_list, inline=False)
+                header = ""
+                embed = discord.Embed(
+                    title=f"Status of user {member}",
+                    description="No warnings issued.",
+                    colour=config.GREEN,
+                )
+                embed.add_field(name="Warnings:", value=warn_user['warnings'] if warn_user else "0")
+                embed.add_field(name="Kicks:", value=warn_user['kicks'] if warn_user else "0")
+                embed.add_field(name="Bans:", value=warn_user['bans'] if warn_user else "0")
+                embed.add_field(
+                    name="Joined:",
+                    value=member.joined_at.strftime("%b-%d-%Y %H:%M:%S"),
+                )
+                embed.add_field(
+                    name="Created:",
+                    value=member.created_at.strftime("%b-%d-%Y %H:%M:%S"),
+                )
+                embed.add_field(name="Boosting since", value=boosting, inline=False)
+                embed.add_field(name="Roles", value=role_list, inline=False)
 
-                    embed.set_footer(text=config.FOOTER)
+            else:
+                header = "**User is no longer in the server**\n"
+                embed = discord.Embed(
+                    title=f"Status of user {user}",
+                    description="**User is not part of the server.**",
+                    colour=config.GREEN,
+                )
+                embed.add_field(name="Warnings:", value=warn_user['warnings'] if warn_user else "0")
+                embed.add_field(name="Kicks:", value=warn_user['kicks'] if warn_user else "0")
+                embed.add_field(name="Bans:", value=warn_user['bans'] if warn_user else "0")
+                embed.add_field(name="Joined:", value="N/A")
+
+            embed.set_footer(text=config.FOOTER)
 
+            if not warn_user:
                 await ctx.respond(content=None, embed=embed)
+                return
 
-            else:
-                warn_reasons = self.database.getWarnReasons(str(user.id))
-                warn_user = self.database.getWarnUserByID(str(user.id))
-                if len(warn_user) > 0:
-                    embed = discord.Embed(
-                        title=f"Status of user {user}",
-                        description="**User is no longer in the server**\n"
-                        + "\n".join(
-                            "{}: {}".format(*k)
-                            for k in enumerate(warn_reasons)
-                        ),
-                        colour=config.GREEN,
+            async def render(before, page):
+                # Warning reasons are fetched one page at a time, newest first
+                reasons = await self.database.getWarnReasonsPage(
+                    str(user.id), before, REASONS_PER_PAGE + 1
+                )
+                more = len(reasons) > REASONS_PER_PAGE
+                reasons = reasons[:REASONS_PER_PAGE]
+
+                page_embed = embed.copy()
+                if reasons:
+                    page_embed.description = header + "\n".join(
+                        f"{i}: {row['reason'][:REASON_MAX_CHARS]}"
+                        for i, row in enumerate(reasons, start=page * REASONS_PER_PAGE)
                     )
-                    embed.add_field(name="Warnings:", value=warn_user['warnings'])
-                    embed.add_field(name="Kicks:", value=warn_user['kicks'])
-                    embed.add_field(name="Bans:", value=warn_user['bans'])
-                    embed.add_field(name="Joined:", value="N/A")
-                    embed.set_footer(text=config.FOOTER)
-
-                    await ctx.respond(content=None, embed=embed)
                 else:
-                    embed = discord.Embed(
-                        title=f"Status of user {user}",
-                        description="**User is not part of the server.**",
-                        colour=config.GREEN,
-                    )
-                    embed.add_field(name="Warnings:", value="0")
-                    embed.add_field(name="Kicks:", value="0")
-                    embed.add_field(name="Bans:", value="0")
-                    embed.add_field(name="Joined:", value="N/A")
-                    embed.set_footer(text=config.FOOTER)
+                    # A warn_user row can exist without any reason left
+                    page_embed.description = header + "No warnings issued."
+                page_embed.set_footer(text=f"{config.FOOTER} - Page {page + 1}")
 
-                    await ctx.respond(content=None, embed=embed)
+                return page_embed, reasons[-1]['id'] if more else None
+
+            paginator = support.Paginator(render, author=ctx.author)
+            embed = await paginator.first_page()
+            if paginator.has_pages:
+                await ctx.respond(content=None, embed=embed, view=paginator)
+            else:
+                await ctx.respond(content=None, embed=embed)
 
         else:
             await ctx.respond("Something went wrong")
@@ -497,9 +431,8 @@ class ModerationSlash(commands.Cog):
         """Warn the selected user."""
         print(f"INFO: Warning {member}...")
         try:
-            self.database.addWarning(str(member.id), str(member.name), reason)
-            warn_users = self.database.getWarnUserByID(str(member.id))
-            channel = ctx.guild.get_channel(config.LOG_CHAN)
+            await self.database.addWarning(str(member.id), str(member.name), reason)
+            warn_users = await self.database.getWarnUserByID(str(member.id))
             embed = discord.Embed(
                 title="Warning issued!",
                 description=f"Reason: {reason}",
@@ -510,7 +443,7 @@ class ModerationSlash(commands.Cog):
             embed.add_field(name="Total Warnings:", value=warn_users['warnings'])
             embed.set_footer(text=config.FOOTER)
 
-            await channel.send(content=None, embed=embed)
+            self.bot.modlog.post(embed)
             await ctx.respond(embed=discord.Embed(title=f"{member} has been warned"))
             print("INFO: Done.")
         except:
@@ -529,7 +462,7 @@ class ModerationSlash(commands.Cog):
         """Remove the last warn from a user's warnings list."""
         if member is not None:
 
-            self.database.delWarning(str(member.id), reason="")
+            await self.database.delWarning(str(member.id), reason="")
 
             # Reply to command
             await ctx.respond(
@@ -538,9 +471,8 @@ class ModerationSlash(commands.Cog):
             )
 
             # Log the event in the log channel
-            log_channel = ctx.guild.get_channel(config.LOG_CHAN)
-            await log_channel.send(
-                embed=discord.Embed(
+            self.bot.modlog.post(
+                discord.Embed(
                     title=f"Last warning removed from user {member}",
                     colour=config.GREEN,
                 )
@@ -567,7 +499,7 @@ class ModerationSlash(commands.Cog):
     ):
         # Remove all warnings from a user's warning list.
         if member is not None:
-            self.database.delAllWarnings()
+            await self.database.delAllWarnings()
             await ctx.respond(
                 embed=discord.Embed(
                     title=f"Warnings cleared for user {member}", colour=config.GREEN
@@ -588,15 +520,14 @@ class ModerationSlash(commands.Cog):
         self, ctx, member: Option(discord.Member, "Member for which to show JAC status")
     ):
         """Get the details of the JAC entry for a selected user."""
-        jac = self.database.getJacByID(str(member.id))
+        jac = await self.database.getJacByID(str(member.id))
 
         if len(jac) > 0:
             tz_TX = pytz.timezone("US/Central")
             now = datetime.now(tz_TX)
-            dt = datetime.strptime(jac[0]['date'], "%b-%d-%Y %H:%M:%S")
-            dt = dt.replace(tzinfo=tz_TX)
+            dt = jac[0]['date'].replace(tzinfo=tz_TX)
 
-            end = dt + timedelta(days=14)
+            end = dt + timedelta(days=getattr(config, "JAC_RETENTION_DAYS", 14))
 
             delta = end - now
 
@@ -605,7 +536,7 @@ class ModerationSlash(commands.Cog):
                 description=jac[0]['link'],
                 colour=config.GREEN,
             )
-            embed.add_field(name="Timestamp", value=jac[0]['date'])
+            embed.add_field(name="Timestamp", value=jac[0]['date'].strftime("%b-%d-%Y %H:%M:%S"))
             embed.add_field(name="Time left", value=str(delta), inline=False)
             embed.set_footer(text=config.FOOTER)
 
@@ -623,7 +554,7 @@ class ModerationSlash(commands.Cog):
     ):
         """Remove the JAC entry for the selected user."""
         if member is not None:
-            self.database.delJac(str(member.id))
+            await self.database.delJac(str(member.id))
             await ctx.respond(
                 embed=discord.Embed(
                     title=f"JAC entry removed for user {member}", colour=config.GREEN
@@ -642,48 +573,55 @@ class ModerationSlash(commands.Cog):
     async def show_timers(self, ctx, group: str = None):
         """Show a list of currently active timers."""
         if group is None:
-            t = self.database.getTimers()
-
-            timers = []
-            for elem in t:
-
-                usr = await self.bot.fetch_user(int(elem[0]))
-                ban = str(t[elem][1])
-                mute = str(t[elem][2])
-                endBan = str(t[elem][3])
-                endMute = str(t[elem][4])
-
-
-                timers.append(
-                    f"{usr.mention}"
-                    + "```\nBan: "
-                    + ban
-                    + "\nMute: "
-                    + mute
-                    + "\nendBan: "
-                    + endBan
-                    + "\nendMute: "
-                    + endMute
-                    + "```"
-                )
 
-            if not timers:
-                await ctx.respond(
-                    embed=discord.Embed(
-                        title="There are no timers left.", colour=config.YELLOW
+            async def render(after, page):
+                # One extra row tells whether there is a next page
+                t = await self.database.getTimersPage(after, TIMERS_PER_PAGE + 1)
+                more = len(t) > TIMERS_PER_PAGE
+                t = t[:TIMERS_PER_PAGE]
+
+                # Look up every user of the page at once, mostly from the caches
+                users = await self.bot.resolver.resolve_many(elem['user_id'] for elem in t)
+
+                timers = []
+                for elem, usr in zip(t, users):
+
+                    mention = usr.mention if usr is not None else f"<@{elem['user_id']}>"
+                    timers.append(
+                        f"{mention}"
+                        + "```\nBan: "
+                        + str(elem['ban'])
+                        + "\nMute: "
+                        + str(elem['mute'])
+                        + "\nendBan: "
+                        + str(elem['endBan'])
+                        + "\nendMute: "
+                        + str(elem['endMute'])
+                        + "```"
                     )
-                )
-            else:
 
+                if not timers:
+                    return discord.Embed(
+                        title="There are no timers left.", colour=config.YELLOW
+                    ), None
+
+                start = page * TIMERS_PER_PAGE
                 embed = discord.Embed(
                     title="Timers",
                     description="\n".join(
-                        "{}: {}".format(*k) for k in enumerate(timers)
+                        "{}: {}".format(*k) for k in enumerate(timers, start=start)
                     ),
                     colour=config.GREEN,
                 )
-                embed.set_footer(text=config.FOOTER)
+                embed.set_footer(text=f"{config.FOOTER} - Page {page + 1}")
+
+                return embed, t[-1]['user_id'] if more else None
 
+            paginator = support.Paginator(render, author=ctx.author)
+            embed = await paginator.first_page()
+            if paginator.has_pages:
+                await ctx.respond(embed=embed, view=paginator)
+            else:
                 await ctx.respond(embed=embed)
 
     # /delete Command
@@ -696,8 +634,6 @@ class ModerationSlash(commands.Cog):
         await ctx.respond("Deleting", ephemeral=True)
         await ctx.channel.purge(limit=messages)
 
-        channel = ctx.guild.get_channel(config.LOG_CHAN)
-
         embed = discord.Embed(
             title="Bulk Message Deletion",
             description=f"{messages} messages were deleted \
@@ -706,7 +642,7 @@ class ModerationSlash(commands.Cog):
         )
         embed.set_footer(text=config.FOOTER)
 
-        await channel.send(content=None, embed=embed)
+        self.bot.modlog.post(embed)
 
     # /slow Command
     @slash_command(guild_ids=[config.GUILD], name="slow", default_permission=False)
@@ -767,14 +703,31 @@ class ModerationSlash(commands.Cog):
     async def killcount(
         self,
         ctx,
-        member: Option(discord.Member, "Counter for Member, defaults to all", required=False)
+        member: Option(discord.Member, "Counter for Member, defaults to all", required=False),
+        top: Option(
+            int, "Show the members with the most kills", required=False,
+            default=None, min_value=1, max_value=25
+        ),
     ):
-        """Get total kill count or specific count for a member"""
-        if not member:
-            counter = self.database.getKillCount("*")
+        """Get total kill count, specific count for a member or the top offenders"""
+        if top:
+            leaders = await self.database.getKillLeaders(top)
+            board = "\n".join(
+                f"{i}. <@{row['user_id']}> - {row['counter']}"
+                for i, row in enumerate(leaders, start=1)
+            )
+            embed = discord.Embed(
+                title=f"Kill board - top {top}",
+                description=board or "The kill board is empty.",
+                colour=config.RED,
+            )
+            embed.set_footer(text=config.FOOTER)
+            await ctx.respond(embed=embed)
+        elif not member:
+            counter = await self.database.getKillCount("*")
             await ctx.respond(f"Total kill counter is {counter}.")
         else:
-            counter = self.database.getKillCount(str(member.id))
+            counter = await self.database.getKillCount(str(member.id))
             await ctx.respond(f"Kill count for member {member} is {counter}.")
 
 
@@ -0,0 +1,313 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613
+# pyright: reportMissingImports=false, reportMissingModuleSource=false
+import re
+from collections import deque, namedtuple
+from urllib.parse import urlsplit
+import config
+
+# Tag -> name of the word list in config.py
+CONFIG_LISTS = {
+    "blacklist": "BLACKLIST",
+    "scamtext": "SCAMTEXT",
+    "scamurl": "SCAMURLS",
+    "whitelist": "INVITE_WHITELIST",
+    "banlist": "INVITE_BANLIST",
+    "nsfw": "NSFW",
+}
+
+# Fixed markers the message checks look for
+MARKERS = {
+    "invite": ("discord.gg/", "discord.com/", "discordapp.com/invite"),
+    "channel_link": ("discord.com/channels",),
+    "everyone": ("@everyone",),
+    "here": ("@here",),
+}
+
+# Parts of a message extracted by MessageAnalysis
+URL_PATTERN = re.compile(r"https?://[^\s]+")
+# Invite links as stored in the jac table, scheme characters included
+INVITE_PATTERN = re.compile(r"[https?://]*discord.gg/[^\s]+")
+# Discord links without a scheme, any case like the invite markers, so an
+# invite always yields its link
+DISCORD_URL_PATTERN = re.compile(r"(?:discord.gg|discord.com|discordapp.com)/[^\s]+", re.IGNORECASE)
+# Link to a message: guild, channel and message IDs
+MESSAGE_LINK_PATTERN = re.compile(r"discord.com/channels/(\d+)/(\d+)/(\d+)", re.IGNORECASE)
+
+# Tags matched with their exact case, every other tag is case-insensitive.
+# The invite lists follow the invite markers, a whitelisted invite in
+# another case is still whitelisted
+CASE_SENSITIVE = {"nsfw", "everyone", "here"}
+
+# A SCAMURLS entry that is only a host name, indexed by domain
+DOMAIN_PATTERN = re.compile(r"^[a-z0-9-]+(?:\.[a-z0-9-]+)+$")
+
+Match = namedtuple("Match", "tag pattern start end")
+
+
+class Matches:
+    """Tagged result of a single scan over a message."""
+
+    def __init__(self, matches):
+        self._by_tag = {}
+        for match in matches:
+            self._by_tag.setdefault(match.tag, []).append(match)
+
+    def __contains__(self, tag):
+        return tag in self._by_tag
+
+    def get(self, tag):
+        """All the matches of a tag, in the order they were found."""
+        return self._by_tag.get(tag, [])
+
+    def within(self, tag, start, end):
+        """True if a match of tag lies entirely inside text[start:end]."""
+        return any(start <= m.start and m.end <= end for m in self.get(tag))
+
+    def outside(self, tag, spans):
+        """True if a match of tag does not overlap any of the (start, end) spans."""
+        return any(
+            all(m.end <= s or m.start >= e for s, e in spans) for m in self.get(tag)
+        )
+
+
+class Matcher:
+    """Aho-Corasick automaton built from tagged word lists.
+
+    A message is scanned once, character by character, no matter how many
+    words are in the lists, and every occurrence of every word is reported
+    with its tag and position.
+    """
+
+    def __init__(self, lists):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for tag, words in lists.items():
+            for word in words:
+                if word:
+                    self._insert(tag, word)
+        self._build_links()
+
+    def _insert(self, tag, word):
+        node = 0
+        for char in word.lower():
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][char] = nxt
+            node = nxt
+        self._out[node].append((tag, word))
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str, lowered: str = None) -> Matches:
+        """Return every tagged word found in text, lowered is text.lower() if known."""
+        if lowered is None:
+            lowered = text.lower()
+        # Lowercasing can change the length of some unicode strings
+        aligned = len(lowered) == len(text)
+        goto, fail, out = self._goto, self._fail, self._out
+
+        found = []
+        node = 0
+        for i, char in enumerate(lowered):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for tag, word in out[node]:
+                end = i + 1
+                start = end - len(word)
+                if tag in CASE_SENSITIVE:
+                    if aligned and text[start:end] != word:
+                        continue
+                    if not aligned and word not in text:
+                        continue
+                found.append(Match(tag, word, start, end))
+        return Matches(found)
+
+
+def url_host(url: str) -> str:
+    """Normalized host of a URL or bare host name, None if there is none.
+
+    Lowercased, without scheme, credentials, port or trailing dot, and
+    IDNA encoded, so unicode look-alike domains compare as punycode.
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = "//" + url
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    # Punctuation following a URL in a sentence ends up in the host
+    host = host.rstrip(".,;!)]>'\"")
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return host.lower() or None
+
+
+class DomainIndex:
+    """Trie of domains keyed by their labels in reverse order.
+
+    A host matches when it is one of the domains or a subdomain of one, so a
+    lookup walks the labels of the host once, whatever the number of domains,
+    and "evil.com" never matches "notevil.com" or "evil.com.example.org".
+    """
+
+    _END = ""
+
+    def __init__(self, domains=()):
+        self._root = {}
+        self._size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, domain: str):
+        host = url_host(domain)
+        if host is None:
+            return
+        node = self._root
+        for label in reversed(host.split(".")):
+            node = node.setdefault(label, {})
+        if self._END not in node:
+            node[self._END] = host
+            self._size += 1
+
+    def match(self, host: str) -> str:
+        """The indexed domain host belongs to, None if it belongs to none."""
+        node = self._root
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                return None
+            if self._END in node:
+                return node[self._END]
+        return None
+
+
+def split_scam_urls(entries):
+    """Split SCAMURLS into host names, for the DomainIndex, and other patterns.
+
+    Entries with a path, a partial name or anything else that is not a host
+    keep being matched as substrings of the URLs by the Matcher.
+    """
+    domains, patterns = [], []
+    for entry in entries:
+        if not entry:
+            continue
+        bare = entry.strip().split("://", 1)[-1].rstrip("/")
+        host = url_host(bare)
+        if host is not None and not any(c in bare for c in "/:@?#") and DOMAIN_PATTERN.match(host):
+            domains.append(host)
+        else:
+            patterns.append(entry)
+    return domains, patterns
+
+
+_matcher = None
+_matcher_key = None
+_domains = None
+_domains_key = None
+
+
+def get_matcher() -> Matcher:
+    """Matcher for the current config lists, rebuilt when config.py is reloaded."""
+    global _matcher, _matcher_key
+
+    lists = {tag: getattr(config, name, []) for tag, name in CONFIG_LISTS.items()}
+    key = tuple((id(words), len(words)) for words in lists.values())
+
+    if _matcher is None or key != _matcher_key:
+        # Host names are looked up in the DomainIndex instead
+        lists["scamurl"] = split_scam_urls(lists["scamurl"])[1]
+        lists.update(MARKERS)
+        _matcher = Matcher(lists)
+        _matcher_key = key
+    return _matcher
+
+
+def get_domain_index() -> DomainIndex:
+    """DomainIndex of the host names in SCAMURLS, rebuilt when config.py is reloaded."""
+    global _domains, _domains_key
+
+    entries = getattr(config, CONFIG_LISTS["scamurl"], [])
+    key = (id(entries), len(entries))
+
+    if _domains is None or key != _domains_key:
+        _domains = DomainIndex(split_scam_urls(entries)[0])
+        _domains_key = key
+    return _domains
+
+
+class MessageAnalysis:
+    """Everything the message checks look at, extracted once per message.
+
+    Attributes:
+    content         -- the message content
+    lowered         -- the content in lowercase
+    matches         -- word list matches of the content
+    urls            -- (url, (start, end)) of each http(s) URL, in order
+    hosts           -- normalized host of each of the urls, None if invalid
+    scam_urls       -- the urls matching SCAMURLS, by domain or by pattern, or
+                       the domains of the scam feed when one is given
+    invites         -- discord.gg invite links
+    discord_urls    -- discord.gg and discord.com links, with or without scheme
+    message_links   -- (guild_id, channel_id, message_id) of each message link
+    everyone, here  -- True if the content mentions @everyone or @here
+    """
+
+    __slots__ = ("content", "lowered", "matches", "urls", "hosts", "scam_urls", "invites",
+                 "discord_urls", "message_links", "everyone", "here")
+
+    def __init__(self, content: str, matcher: Matcher = None, domains: DomainIndex = None, feed=None):
+        self.content = content
+        self.lowered = content.lower()
+        self.matches = (matcher or get_matcher()).scan(content, self.lowered)
+
+        # Each pattern only runs when the content can hold a match
+        self.urls = [
+            (match.group(), match.span()) for match in URL_PATTERN.finditer(content)
+        ] if "://" in content else []
+        self.hosts = [url_host(url) for url, _ in self.urls]
+        self.scam_urls = []
+        if self.urls:
+            domains = domains or get_domain_index()
+            for (url, span), host in zip(self.urls, self.hosts):
+                if host is not None and (domains.match(host) or (feed is not None and feed.match(host))):
+                    self.scam_urls.append(url)
+                elif self.matches.within("scamurl", *span):
+                    self.scam_urls.append(url)
+        self.invites = INVITE_PATTERN.findall(content) if "discord.gg/" in content else []
+        self.discord_urls = DISCORD_URL_PATTERN.findall(content) if "invite" in self.matches else []
+        self.message_links = [
+            tuple(int(part) for part in match.groups())
+            for match in MESSAGE_LINK_PATTERN.finditer(content)
+        ] if "channel_link" in self.matches else []
+        self.everyone = "everyone" in self.matches
+        self.here = "here" in self.matches
+
+    @property
+    def url(self):
+        """The first http(s) URL, None if there is none."""
+        return self.urls[0][0] if self.urls else None
@@ -1,54 +1,29 @@
 # pylint: disable=F0401, W0702, W0703, W0105, W0613, E1101
 # pyright: reportMissingImports=false, reportMissingModuleSource=false
 import os
-import logging
-from logging.handlers import RotatingFileHandler
-import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
 from dotenv import load_dotenv
 import discord
 from discord.ext import commands, tasks
 from cogwatch import Watcher
 import config
+import logsetup
 import support
 import cogs.database as db
+from scheduler import TimerScheduler
+from modlog import ModLogDispatcher
+from auditlog import AuditLogTailer
+from resolver import UserResolver
+from scamfeed import ScamFeed
+from scamtracker import ScamTracker
+from incidents import IncidentTracker
 
-#Setup module logging
-log = logging.getLogger(__name__)
-log.setLevel(logging.INFO)
-
-log_formatter = logging.Formatter("%(name)s - %(asctime)s:%(levelname)s: %(message)s")
-
-file_handler = RotatingFileHandler(
-    filename=f"logs/{__name__}.log",
-    mode="a",
-    maxBytes=20000,
-    backupCount=5,
-    encoding="utf-8")
-file_handler.setFormatter(log_formatter)
-
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(log_formatter)
-
-log.addHandler(file_handler)
-log.addHandler(console_handler)
+#Setup module logging, records are written by a background thread
+log = logsetup.get_logger(__name__)
 
 # cogwatch logger
-#Setup module logging
-watch_log = logging.getLogger("cogwatch")
-watch_log.setLevel(logging.INFO)
-
-watch_file_handler = RotatingFileHandler(
-    filename="logs/cogwatch.log",
-    mode="a",
-    maxBytes=20000,
-    backupCount=5,
-    encoding="utf-8")
-watch_file_handler.setFormatter(log_formatter)
-
-watch_log.addHandler(watch_file_handler)
-watch_log.addHandler(console_handler)
+watch_log = logsetup.get_logger("cogwatch")
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
@@ -78,7 +53,33 @@ bot = commands.Bot(
     intents=intents,
 )
 
-database = db.Database(bot)
+# Single database instance and connection pool, shared with the cogs through bot.database
+_database = db.Database(bot, db.create_pool())
+# Bring the schema up to date before anything reads from it
+_database.migrate()
+database = db.AsyncDatabase(_database)
+bot.database = database
+
+# Cached user lookups, shared through bot.resolver
+bot.resolver = UserResolver(bot, config.GUILD)
+
+# Single task expiring mutes and tempbans, shared through bot.scheduler
+bot.scheduler = TimerScheduler(bot, database)
+
+# Single sender for the mod-log channel, shared through bot.modlog
+bot.modlog = ModLogDispatcher(bot, config.LOG_CHAN)
+
+# Single reader of the audit log, shared through bot.auditlog
+bot.auditlog = AuditLogTailer(bot, config.GUILD)
+
+# Domains of the local scam blocklists, shared through bot.scamfeed
+bot.scamfeed = ScamFeed()
+
+# Scam URLs and authors pending review, shared through bot.scams
+bot.scams = ScamTracker()
+
+# Scam waves grouped into a single review, shared through bot.incidents
+bot.incidents = IncidentTracker(bot)
 
 # Here starts the logic
 if __name__ == "__main__":
@@ -91,131 +92,33 @@ if __name__ == "__main__":
             log.exception("Failed to load extension %s", extension)
 
 
-async def check_jac_timers(now):
-    """Check which JAC timers have surpassed 14 days and remove from list."""
-    #print("Checking if there are JAC logs to remove...")
-
-    jac = database.getJac()
-    for elem in jac:
-        # entry_time = datetime.strptime(jac[elem]['date'].split(" ")[0],'%b-%d-%Y')
-        entry_time = datetime.strptime(elem['date'], "%b-%d-%Y %H:%M:%S")
-        delta = timedelta(days=14)
-        newtime = entry_time + delta
-
-        # check if 14 days have passed
-        if newtime < now:
-            print(f"Removing entry for {elem['user_id']}")
-            #del jac[elem]
-            database.delJac(elem['user_id'])
-
-
-async def check_mute_timers(now, time_db, guild, channel, mem):
-    """Check which finished mute timers have been missed and remove the mute."""
-    mute_time = datetime.strptime(time_db[4], "%b-%d-%Y %H:%M:%S")
-
-    # If timer ran out, unmute user
-    if mute_time < now:
-        print(f"\nUser {mem} needs to be unmuted.")
-
-        try:
-            member = await guild.fetch_member(int(mem))
-            role = guild.get_role(config.MUTE_ID)
-            # Create embed to log unmuting
-            embed = discord.Embed(
-                title="Timed mute complete",
-                description=f"User {member} has been unmuted automatically.",
-                colour=config.YELLOW,
-            )
-            embed.set_footer(text=config.FOOTER)
-
-            await channel.send(content=None, embed=embed)
-            await member.remove_roles(role)
-
-            database.delTimer(str(mem))
-
-        except:
-            log.exception("\nError in fetching user, removing entry from db...")
-            database.delTimer(str(mem))
-
-
-async def check_ban_timers(now, time_db, guild, channel, mem):
-    """Check which finished ban timers have been missed and remove the ban"""
-    ban_time = datetime.strptime(time_db['endBan'], "%b-%d-%Y %H:%M:%S")
-
-    # If timer ran out, unban user
-    if ban_time < now:
-
-        user = await bot.fetch_user(int(mem))
-        # Create embed to log unbanning
-        embed = discord.Embed(
-            title="Timed ban complete",
-            description=f"User {user.name}#{user.discriminator} \
-                    has been unbanned automatically.",
-            colour=config.YELLOW,
-        )
-        embed.set_footer(text=config.FOOTER)
-
-        await channel.send(content=None, embed=embed)
-
-        try:
-            await guild.unban(user)
-        except:
-            log.exception("Error while executing timed unban")
-        database.delTimer(str(mem))
-
-    # Re-add the timer to the list -- this could cause duplicate timers
-    elif ban_time > now:
-        user = await bot.fetch_user(int(mem))
-        print(f"\nUser {mem} is tempbanned. Adding to wait...")
-        await asyncio.sleep((ban_time - now).total_seconds())
-        try:
-            await guild.unban(user)
-        except:
-            log.exception("Error while executing timed unban")
-        database.delTimer(str(mem))
-
-
 @tasks.loop(minutes=60)
-async def check_timers():
-    """Task that runs every 60 minutes, checking all active timers for any that finished."""
-    # Setup variables
-    guild = await bot.fetch_guild(config.GUILD)
-    channel = bot.get_channel(config.LOG_CHAN)
-
-    # Setup current time
-    tz_TX = pytz.timezone("US/central")
-    now_string = datetime.now(tz_TX).strftime("%b-%d-%Y %H:%M:%S")
-    now = datetime.strptime(now_string, "%b-%d-%Y %H:%M:%S")
-
-    # Run through the timers
+async def expire_jac():
+    """Task that runs every 60 minutes, removing expired JAC entries.
+
+    Mute and ban timers are expired on time by the TimerScheduler.
+    """
     # JAC refers to channel join-a-clan, where clan ads are posted
     try:
-        await check_jac_timers(now)
-
-        #print("Checking if I missed some unbanning or unmuting...")
-        timers = database.getTimers()
-
-        # Cycle database to check for timed events to resume
-        for elem in timers:
-            print(
-                elem['user_id'] + "- Ban: " + str(elem['ban']) + ", Mute: " + str(elem['mute'])
-            )
-            if elem['mute']:
-                await check_mute_timers(now, elem, guild, channel, elem['user_id'])
-
-            if elem['ban']:
-                await check_ban_timers(now, elem, guild, channel, elem['user_id'])
-
-            # If there are no more timers for a user, there's no need to keep track of them
-            if not elem['mute'] and not elem['ban']:
-                print(f"\nUser {elem['user_id']} has no more timers. Removing from db...")
-                database.delTimer(str(elem[0]))
-
-        #print("Done! Waiting 60 minutes for next check...")
-        #print("-----------")
+        await database.expireJac(getattr(config, "JAC_RETENTION_DAYS", 14))
     except:
-        log.exception("Error while checking timers, waiting next loop...")
-        #print("-----------")
+        log.exception("Error while expiring JAC entries, waiting next loop...")
+
+@tasks.loop(seconds=db.DB_KILL_FLUSH_INTERVAL)
+async def flush_kill_counts():
+    """Task writing the kill counts buffered by the message filters."""
+    try:
+        await database.flushKillCounts()
+    except Exception:
+        log.exception("Error while writing kill counts, retrying next loop...")
+
+@tasks.loop(minutes=db.DB_STATS_INTERVAL)
+async def log_db_stats():
+    """Task logging a summary of the query stats."""
+    # The first iteration runs at startup, nothing has been recorded yet
+    if log_db_stats.current_loop == 0:
+        return
+    log.info("Database query stats:\n%s", database.stats.summary())
 
 @tasks.loop(minutes=15)
 async def war_channel():
@@ -239,8 +142,26 @@ async def on_ready():
     watcher = Watcher(bot, path='cogs')
     await watcher.start()
 
-    # Register view for persistence
+    # Register views for persistence
     bot.add_view(support.Survivor())
+    for view in support.REVIEW_VIEWS:
+        bot.add_view(view())
+
+    # Start sending the queued mod-log embeds
+    bot.modlog.start()
+    bot.auditlog.start()
+
+    # Map the scam domain index, rebuilt if a feed changed
+    try:
+        await bot.scamfeed.start()
+    except Exception:
+        log.exception("Unable to load the scam feed index")
+
+    # Warm up the JAC index used by the join-a-clan check
+    try:
+        await database.loadJac()
+    except Exception:
+        log.exception("Unable to load JAC cache, it will be loaded on first use")
 
     print(
         f"\nLogged in as {bot.user.name} - {bot.user.id}\nAPI version: {discord.__version__}"
@@ -251,8 +172,20 @@ async def on_ready():
     print("-----------")
     await bot.wait_until_ready()
 
-    if not check_timers.is_running():
-        check_timers.start()
+    # Resume mute and ban timers stored in the database
+    try:
+        await bot.scheduler.start()
+    except Exception:
+        log.exception("Unable to start the timer scheduler")
+
+    if not expire_jac.is_running():
+        expire_jac.start()
+
+    if not flush_kill_counts.is_running():
+        flush_kill_counts.start()
+
+    if not log_db_stats.is_running():
+        log_db_stats.start()
 
     if not war_channel.is_running():
         war_channel.start()
@@ -279,3 +212,6 @@ async def on_application_command_error(ctx, error):
 
 
 bot.run(str(TOKEN), reconnect=True)
+
+# Write what is still buffered before exiting
+database.close()
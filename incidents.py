@@ -0,0 +1,209 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613
+# pyright: reportMissingImports=false, reportMissingModuleSource=false
+import re
+import time
+import asyncio
+import hashlib
+import discord
+import config
+import logsetup
+import filters
+import support
+
+
+#Setup module logging
+log = logsetup.get_logger(__name__)
+
+# Parts of a message that change between copies of the same scam
+MENTION_PATTERN = re.compile(r"<[@#][!&]?\d+>|@everyone|@here")
+NUMBER_PATTERN = re.compile(r"\d+")
+SEPARATOR_PATTERN = re.compile(r"[\W_]+")
+
+SHINGLE_SIZE = 4
+
+# Simhash bits are counted in 16-bit lanes of a single integer, one lane per
+# bit of the shingle hashes: _SPREAD[i][b] moves byte b of a hash to the
+# lanes of bits 8i to 8i+7, so a shingle costs 8 lookups instead of 64 tests
+LANE = 16
+_SPREAD = [
+    [sum(1 << (LANE * (8 * i + bit)) for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+    for i in range(8)
+]
+# Accounts listed in the review embed, the others are only counted
+MAX_LISTED = 30
+
+
+def normalize(analysis: filters.MessageAnalysis) -> str:
+    """Text of a message with URLs reduced to their host and volatile parts removed."""
+    text = filters.URL_PATTERN.sub(" ", analysis.lowered)
+    hosts = " ".join(host for host in analysis.hosts if host)
+    text = MENTION_PATTERN.sub(" ", f"{text} {hosts}")
+    text = NUMBER_PATTERN.sub("0", text)
+    return " ".join(SEPARATOR_PATTERN.sub(" ", text).split())
+
+
+def simhash(text: str) -> int:
+    """64-bit simhash of the character shingles of text, near-duplicates differ by few bits."""
+    if len(text) <= SHINGLE_SIZE:
+        shingles = [text]
+    else:
+        shingles = [text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)]
+
+    # Lanes would overflow past 65535 shingles
+    shingles = shingles[:(1 << LANE) - 1]
+    lanes = 0
+    for shingle in shingles:
+        digest = hashlib.blake2b(shingle.encode(), digest_size=8).digest()
+        for i, byte in enumerate(digest):
+            lanes += _SPREAD[i][byte]
+
+    # A bit is set when it is set in more than half of the shingle hashes
+    half = len(shingles) // 2
+    mask = (1 << LANE) - 1
+    return sum(1 << bit for bit in range(64) if (lanes >> (LANE * bit)) & mask > half)
+
+
+def fingerprint(analysis: filters.MessageAnalysis) -> int:
+    """Fingerprint of a message, None if nothing is left to compare."""
+    text = normalize(analysis)
+    return simhash(text) if text else None
+
+
+class Incident:
+    """Messages of one scam campaign, reviewed with a single embed."""
+
+    def __init__(self, fingerprint: int, url: str, author: discord.Member):
+        self.fingerprint = fingerprint
+        self.url = url
+        self.user_id = author.id
+        self.users = {author.id: author.mention} # every author, in order
+        self.messages = 1
+        self.last_seen = time.monotonic()
+        self.review = asyncio.get_running_loop().create_future() # the review message
+        self._update = None
+
+    def add(self, author: discord.Member) -> bool:
+        """Count a message. Returns True if its author is new to the incident."""
+        self.messages += 1
+        self.last_seen = time.monotonic()
+        if author.id in self.users:
+            return False
+        self.users[author.id] = author.mention
+        return True
+
+
+class IncidentTracker:
+    """Groups scam messages into incidents, one review per campaign.
+
+    Messages are fingerprinted by their normalized text and URL hosts. A
+    message whose fingerprint is within max_distance bits of an incident
+    seen in the last window seconds joins it: its author is added to the
+    review, which is edited at most once per interval, instead of getting
+    an embed and a view of its own.
+    """
+
+    def __init__(self, bot, window=None, max_distance=None, interval=None):
+        self.bot = bot
+        self.window = window if window is not None else getattr(config, "INCIDENT_WINDOW", 600)
+        self.max_distance = max_distance if max_distance is not None else getattr(config, "INCIDENT_DISTANCE", 8)
+        self.interval = interval if interval is not None else getattr(config, "INCIDENT_INTERVAL", 5)
+        self._incidents = []
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.window
+        self._incidents = [incident for incident in self._incidents if incident.last_seen >= cutoff]
+
+    def _find(self, value):
+        self._prune()
+        if value is None:
+            return None
+        best, distance = None, self.max_distance + 1
+        for incident in self._incidents:
+            bits = bin(incident.fingerprint ^ value).count("1")
+            if bits < distance:
+                best, distance = incident, bits
+        return best
+
+    def track(self, analysis: filters.MessageAnalysis, url: str, author: discord.Member,
+              open_new: bool = True):
+        """Add a scam message to the open incident of its campaign, or start one.
+
+        Returns the incident and True if it was started by this message, then
+        its review message has to be attached with set_review once sent.
+        Returns None and False when there is no incident to join and
+        open_new is False.
+        """
+        value = fingerprint(analysis)
+        incident = self._find(value)
+        if incident is not None:
+            self.join(incident, author)
+            return incident, False
+        if not open_new:
+            return None, False
+
+        incident = Incident(value, url, author)
+        if value is not None:
+            self._incidents.append(incident)
+        return incident, True
+
+    def set_review(self, incident: Incident, message: discord.Message):
+        if not incident.review.done():
+            incident.review.set_result(message)
+
+    def drop(self, incident: Incident):
+        """Forget an incident whose review could not be sent."""
+        incident.review.cancel()
+        if incident in self._incidents:
+            self._incidents.remove(incident)
+
+    def close(self, message_id: int):
+        """Forget the incident of a handled review, later messages open a new one."""
+        self._incidents = [
+            incident for incident in self._incidents
+            if not (incident.review.done() and not incident.review.cancelled()
+                    and incident.review.result().id == message_id)
+        ]
+
+    def join(self, incident: Incident, author: discord.Member):
+        """Add a message to an incident and schedule the update of its review."""
+        if incident.add(author) and (incident._update is None or incident._update.done()):
+            incident._update = asyncio.create_task(self._update_review(incident))
+
+    async def _update_review(self, incident):
+        message = await incident.review
+        users = ()
+        # Authors joining during an edit are picked up by the next one
+        while len(users) != len(incident.users) and incident in self._incidents:
+            # Let the rest of the wave join before editing
+            await asyncio.sleep(self.interval)
+            users = list(incident.users)
+            message = await self._edit_review(incident, message, users)
+
+    async def _edit_review(self, incident, message, users):
+        # Don't bring back the buttons of a review handled meanwhile
+        if await self.bot.database.getReview(str(message.id)) is None:
+            self.close(message.id)
+            return message
+
+        await self.bot.database.addReview(
+            str(message.id), support.REVIEW_SCAM, str(incident.user_id),
+            {"url": incident.url, "users": [str(user_id) for user_id in users]},
+        )
+
+        embed = message.embeds[0].copy() if message.embeds else discord.Embed()
+        embed.title = f"Possible scam wave - {len(users)} accounts, {incident.messages} messages"
+        mentions = " ".join(list(incident.users.values())[:MAX_LISTED])
+        if len(users) > MAX_LISTED:
+            mentions += f" and {len(users) - MAX_LISTED} more"
+        for index, field in enumerate(embed.fields):
+            if field.name == "Accounts":
+                embed.set_field_at(index, name="Accounts", value=mentions, inline=False)
+                break
+        else:
+            embed.add_field(name="Accounts", value=mentions, inline=False)
+
+        try:
+            return await message.edit(embed=embed, view=support.ScamReview(len(users)))
+        except discord.HTTPException as err:
+            log.error("Unable to update the review of a scam wave: %s", err)
+            return message
@@ -0,0 +1,114 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613, global-statement
+import os
+import sys
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from dotenv import load_dotenv
+
+# --- Load Environment Variables ---
+load_dotenv()
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+try:
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", "20000"))
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+except ValueError:
+    sys.exit("Error: LOG_MAX_BYTES and LOG_BACKUP_COUNT must be integers.")
+
+log_formatter = logging.Formatter("%(name)s - %(asctime)s:%(levelname)s: %(message)s")
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Enqueue records untouched, formatting is left to the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+
+class _FileRouter(logging.Handler):
+    """Write each record to the rotating file of the logger it belongs to.
+
+    Runs in the listener thread, so rotation and disk writes never happen on
+    the event loop.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._files = {} # logger name -> file name
+        self._handlers = {} # file name -> RotatingFileHandler
+
+    def register(self, name, filename):
+        self._files[name] = filename
+
+    def emit(self, record):
+        # Child loggers write to the file of the closest registered parent
+        name = record.name
+        while name not in self._files and "." in name:
+            name = name.rsplit(".", 1)[0]
+        filename = self._files.get(name)
+        if filename is None:
+            return
+
+        handler = self._handlers.get(filename)
+        if handler is None:
+            handler = RotatingFileHandler(
+                filename=os.path.join(LOG_DIR, filename),
+                mode="a",
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUP_COUNT,
+                encoding="utf-8")
+            handler.setFormatter(log_formatter)
+            self._handlers[filename] = handler
+        handler.handle(record)
+
+    def close(self):
+        for handler in self._handlers.values():
+            handler.close()
+        super().close()
+
+
+_queue = queue.SimpleQueue()
+_router = _FileRouter()
+_listener = None
+
+
+def start():
+    """Start the background listener thread, once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(log_formatter)
+
+    _listener = QueueListener(_queue, _router, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop)
+
+
+def stop():
+    """Flush pending records and stop the listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _router.close()
+    _listener = None
+
+
+def get_logger(name, filename=None, level=logging.INFO):
+    """Return a logger that hands its records to the background listener.
+
+    Records end up on the console and in logs/<filename>, which defaults to
+    the logger name with a .log suffix.
+    """
+    start()
+    log = logging.getLogger(name)
+    log.setLevel(level)
+    _router.register(name, filename or f"{name}.log")
+    if not any(isinstance(h, _DeferredQueueHandler) for h in log.handlers):
+        log.addHandler(_DeferredQueueHandler(_queue))
+    return log
@@ -0,0 +1,119 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613
+# pyright: reportMissingImports=false, reportMissingModuleSource=false
+import asyncio
+from collections import deque
+import discord
+import config
+import logsetup
+
+
+#Setup module logging
+log = logsetup.get_logger(__name__)
+
+# Discord limits for a single message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+class ModLogDispatcher:
+    """Single sender for the embeds posted in the mod-log channel.
+
+    Listeners queue their embeds and return immediately. A background task
+    sends embeds that carry a view (actionable reviews) first, one per message,
+    then coalesces the informational ones up to 10 per message, so a spam wave
+    costs a handful of requests instead of one per event and 429 backoffs
+    never stall the listeners.
+    """
+
+    def __init__(self, bot, channel_id=None, interval=None):
+        self.bot = bot
+        self.channel_id = channel_id or config.LOG_CHAN
+        # Seconds informational embeds wait to be batched together
+        self.interval = interval if interval is not None else getattr(config, "MODLOG_INTERVAL", 2)
+        self._actions = deque() # (embed, view, future)
+        self._info = deque() # (embed, future)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        """Start the dispatch task, once."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def post(self, embed: discord.Embed, view: discord.ui.View = None) -> asyncio.Future:
+        """Queue an embed and return a future resolving to the sent message.
+
+        Embeds with a view are sent on their own, ahead of the batched ones.
+        """
+        future = asyncio.get_running_loop().create_future()
+        # Nobody has to await the result, don't warn about unretrieved errors
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        if view is not None:
+            self._actions.append((embed, view, future))
+        else:
+            self._info.append((embed, future))
+        self._wakeup.set()
+        return future
+
+    async def send(self, embed: discord.Embed, view: discord.ui.View = None) -> discord.Message:
+        """Queue an embed and wait until it has been sent."""
+        return await self.post(embed, view)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            # Let a burst of log embeds pile up, reviews go out right away
+            if not self._actions:
+                await asyncio.sleep(self.interval)
+
+            try:
+                await self._flush()
+            except Exception:
+                log.exception("Error while flushing the mod log queue")
+
+    async def _flush(self):
+        channel = self.bot.get_channel(self.channel_id)
+
+        while self._actions:
+            embed, view, future = self._actions.popleft()
+            await self._deliver(channel, [embed], [future], view)
+
+        while self._info:
+            embeds, futures = [], []
+            size = 0
+            while self._info and len(embeds) < MAX_EMBEDS:
+                embed = self._info[0][0]
+                if embeds and size + len(embed) > MAX_EMBED_CHARS:
+                    break
+                embed, future = self._info.popleft()
+                embeds.append(embed)
+                futures.append(future)
+                size += len(embed)
+            await self._deliver(channel, embeds, futures)
+
+            # Reviews queued meanwhile jump ahead of the remaining batches
+            while self._actions:
+                embed, view, future = self._actions.popleft()
+                await self._deliver(channel, [embed], [future], view)
+
+    async def _deliver(self, channel, embeds, futures, view=None):
+        try:
+            if channel is None:
+                raise RuntimeError(f"Mod log channel {self.channel_id} not found")
+            if view is not None:
+                message = await channel.send(embed=embeds[0], view=view)
+            else:
+                message = await channel.send(embeds=embeds)
+        except Exception as err:
+            log.error("Unable to send %d mod log embeds: %s", len(embeds), err)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(err)
+            return
+
+        for future in futures:
+            if not future.done():
+                future.set_result(message)
@@ -0,0 +1,88 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613
+# pyright: reportMissingImports=false, reportMissingModuleSource=false
+import time
+import asyncio
+from collections import OrderedDict
+import discord
+import config
+import logsetup
+
+
+#Setup module logging
+log = logsetup.get_logger(__name__)
+
+
+class UserResolver:
+    """Resolve user IDs to members or users with as few REST calls as possible.
+
+    The guild member cache and the client user cache are checked first. Users
+    that are in neither are fetched through the API, a limited number at a
+    time, and kept in a small LRU cache with a TTL, unknown IDs included.
+    Concurrent lookups of the same ID share a single request.
+    """
+
+    def __init__(self, bot, guild_id=None, maxsize=1024, ttl=600, concurrency=5):
+        self.bot = bot
+        self.guild_id = guild_id or config.GUILD
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache = OrderedDict() # user_id -> (expires, user or None)
+        self._pending = {} # user_id -> future of an ongoing fetch
+        self._limit = asyncio.Semaphore(concurrency)
+
+    def get(self, user_id: int):
+        """Return the member or user from the caches, without any request."""
+        user_id = int(user_id)
+        guild = self.bot.get_guild(self.guild_id)
+        user = (guild.get_member(user_id) if guild else None) or self.bot.get_user(user_id)
+        if user is not None:
+            return user
+
+        cached = self._cache.get(user_id)
+        if cached is not None and cached[0] > time.monotonic():
+            self._cache.move_to_end(user_id)
+            return cached[1]
+        return None
+
+    async def resolve(self, user_id: int):
+        """Return the member or user with this ID, None if it doesn't exist."""
+        user_id = int(user_id)
+        user = self.get(user_id)
+        if user is not None or self._cached(user_id):
+            return user
+
+        future = self._pending.get(user_id)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(user_id))
+            self._pending[user_id] = future
+            future.add_done_callback(lambda f: self._pending.pop(user_id, None))
+        return await asyncio.shield(future)
+
+    async def resolve_many(self, user_ids):
+        """Resolve several IDs at once, results in the same order."""
+        return await asyncio.gather(*(self.resolve(user_id) for user_id in user_ids))
+
+    def invalidate(self, user_id: int):
+        """Forget a cached lookup."""
+        self._cache.pop(int(user_id), None)
+
+    def _cached(self, user_id):
+        cached = self._cache.get(user_id)
+        return cached is not None and cached[0] > time.monotonic()
+
+    async def _fetch(self, user_id):
+        async with self._limit:
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.NotFound:
+                user = None
+            except discord.HTTPException as err:
+                # Not cached, the next lookup tries again
+                log.error("Unable to fetch user %s: %s", user_id, err)
+                return None
+
+        self._cache[user_id] = (time.monotonic() + self.ttl, user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return user
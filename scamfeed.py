@@ -0,0 +1,193 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613
+# pyright: reportMissingImports=false, reportMissingModuleSource=false
+import os
+import mmap
+import array
+import struct
+import bisect
+import asyncio
+import hashlib
+import ipaddress
+import config
+import logsetup
+import filters
+
+
+#Setup module logging
+log = logsetup.get_logger(__name__)
+
+# Index file layout: magic, number of hashes, then the sorted 64-bit hashes
+MAGIC = b"SCAMIDX1"
+HEADER = struct.Struct("=8sQ")
+
+# Names found in hosts files that are not blocked domains
+HOSTS_NAMES = {"localhost", "localhost.localdomain", "local", "broadcasthost", "ip6-localhost", "ip6-loopback"}
+
+# Hosts whose result is remembered, cleared when full and on reload
+MEMO_SIZE = 4096
+
+
+def domain_hash(host: str) -> int:
+    """64-bit hash of a normalized host name."""
+    return int.from_bytes(hashlib.blake2b(host.encode(), digest_size=8).digest(), "little")
+
+
+def read_feed(path: str):
+    """Yield the normalized domains of a blocklist file.
+
+    Plain lists hold one domain per line, hosts files an address followed by
+    one or more names. Comments start with # and invalid names are skipped.
+    """
+    with open(path, encoding="utf-8", errors="replace") as feed:
+        for line in feed:
+            tokens = line.split("#", 1)[0].split()
+            if not tokens:
+                continue
+            try:
+                ipaddress.ip_address(tokens[0])
+                names = tokens[1:]
+            except ValueError:
+                names = tokens[:1]
+            for name in names:
+                host = filters.url_host(name)
+                if host is not None and host not in HOSTS_NAMES and "." in host:
+                    yield host
+
+
+def build_index(feeds, path: str) -> int:
+    """Write the index of the domains in feeds to path. Returns the number of domains.
+
+    The file is written next to path and moved over it, so readers either
+    see the previous index or the new one, never a partial file.
+    """
+    hashes = set()
+    for feed in feeds:
+        try:
+            hashes.update(domain_hash(host) for host in read_feed(feed))
+        except OSError as err:
+            log.error("Unable to read scam feed %s: %s", feed, err)
+
+    values = array.array("Q", sorted(hashes))
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as index:
+        index.write(HEADER.pack(MAGIC, len(values)))
+        values.tofile(index)
+    os.replace(tmp_path, path)
+    return len(values)
+
+
+class ScamFeed:
+    """Known scam domains from local blocklists, looked up by host.
+
+    The feeds are compiled into a file of sorted 64-bit domain hashes that
+    is memory-mapped, so hundreds of thousands of domains cost a few pages
+    of shared memory and a lookup is a binary search per parent domain. A
+    host matches when it or one of its parent domains is in the feeds. The
+    results of recent hosts are remembered, links get posted more than once.
+    """
+
+    def __init__(self, feeds=None, path=None):
+        self._feeds = feeds
+        self._path = path
+        self._map = None
+        self._hashes = ()
+        self._memo = {} # host -> bool
+        self._lock = asyncio.Lock()
+
+    @property
+    def feeds(self):
+        """Paths of the blocklist files, from config.py unless given."""
+        return self._feeds if self._feeds is not None else getattr(config, "SCAM_FEEDS", [])
+
+    @property
+    def path(self):
+        """Path of the index file, from config.py unless given."""
+        return self._path or getattr(config, "SCAM_FEED_INDEX", "data/scam_domains.idx")
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def load(self) -> bool:
+        """Map the index file if it exists, replacing the current one. Returns True if loaded."""
+        try:
+            with open(self.path, "rb") as index:
+                size = os.fstat(index.fileno()).st_size
+                if size <= HEADER.size:
+                    self._swap(None, ())
+                    return True
+                mapped = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return False
+
+        magic, count = HEADER.unpack_from(mapped)
+        if magic != MAGIC or HEADER.size + count * 8 != len(mapped):
+            mapped.close()
+            log.error("Invalid scam feed index %s, ignored", self.path)
+            return False
+
+        self._swap(mapped, memoryview(mapped)[HEADER.size:].cast("Q"))
+        return True
+
+    def _swap(self, mapped, hashes):
+        old_map, old_hashes = self._map, self._hashes
+        self._map, self._hashes = mapped, hashes
+        self._memo = {}
+        if isinstance(old_hashes, memoryview):
+            old_hashes.release()
+        if old_map is not None:
+            old_map.close()
+
+    def stale(self) -> bool:
+        """True if a feed changed since the index was built."""
+        try:
+            built = os.path.getmtime(self.path)
+        except OSError:
+            return bool(self.feeds)
+        return any(os.path.exists(feed) and os.path.getmtime(feed) > built for feed in self.feeds)
+
+    async def reload(self) -> int:
+        """Rebuild the index from the feeds off the event loop and switch to it.
+
+        Returns the number of domains. Lookups keep using the previous index
+        until the new one is complete.
+        """
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            count = await loop.run_in_executor(None, build_index, list(self.feeds), self.path)
+            self.load()
+        log.info("Scam feed index rebuilt with %d domains from %d feeds", count, len(self.feeds))
+        return count
+
+    async def start(self):
+        """Load the index, rebuilding it first if the feeds changed."""
+        if self.stale():
+            await self.reload()
+        elif self.load():
+            log.info("Scam feed index loaded with %d domains", len(self))
+
+    def match(self, host: str) -> bool:
+        """True if host or one of its parent domains is a known scam domain."""
+        hashes = self._hashes
+        if not hashes:
+            return False
+        found = self._memo.get(host)
+        if found is not None:
+            return found
+
+        found = False
+        labels = host.split(".")
+        # Stop before the top-level domain, never listed on its own
+        for i in range(len(labels) - 1):
+            value = domain_hash(".".join(labels[i:]))
+            index = bisect.bisect_left(hashes, value)
+            if index < len(hashes) and hashes[index] == value:
+                found = True
+                break
+
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[host] = found
+        return found
@@ -0,0 +1,117 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613
+# pyright: reportMissingImports=false, reportMissingModuleSource=false
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from dotenv import load_dotenv
+import config
+import logsetup
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+#Setup module logging
+log = logsetup.get_logger(__name__)
+
+load_dotenv()
+REDIS_URL = os.getenv("REDIS_URL")
+# Seconds to wait on Redis before falling back to memory, it is asked from on_message
+REDIS_TIMEOUT = 0.5
+
+
+class _MemoryStore:
+    """Set of keys expiring ttl seconds after being added, at most maxsize of them."""
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._expires = OrderedDict() # key -> expiry, oldest first
+
+    def _evict(self, now):
+        while self._expires:
+            key, expires = next(iter(self._expires.items()))
+            if expires > now:
+                break
+            del self._expires[key]
+
+    def add(self, key) -> bool:
+        now = time.monotonic()
+        self._evict(now)
+        if key in self._expires:
+            return False
+        self._expires[key] = now + self.ttl
+        while len(self._expires) > self.maxsize:
+            self._expires.popitem(last=False)
+        return True
+
+    def discard(self, key):
+        self._expires.pop(key, None)
+
+    def __len__(self):
+        self._evict(time.monotonic())
+        return len(self._expires)
+
+
+class ScamTracker:
+    """Scam URLs and authors already reported to the moderators.
+
+    Lookups are constant time and entries expire after ttl seconds, reviewed
+    or not, with at most maxsize of each kind kept. With REDIS_URL set the
+    entries live in Redis instead, so they survive restarts; the in-process
+    store takes over while Redis is unreachable or slow to answer.
+    """
+
+    def __init__(self, ttl=None, maxsize=None, redis_url=REDIS_URL, prefix="franky:scam"):
+        ttl = ttl if ttl is not None else getattr(config, "SCAM_TTL", 86400)
+        maxsize = maxsize if maxsize is not None else getattr(config, "SCAM_MAXSIZE", 10000)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._urls = _MemoryStore(ttl, maxsize)
+        self._users = _MemoryStore(ttl, maxsize)
+        self._redis = None
+        if redis_url:
+            if aioredis is None:
+                log.error("REDIS_URL is set but the redis package is missing, scams are tracked in memory")
+            else:
+                self._redis = aioredis.from_url(
+                    redis_url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT)
+
+    @staticmethod
+    def _url_key(url):
+        # URLs can be long, keys are their digest
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    async def _add(self, store, kind, key) -> bool:
+        if self._redis is not None:
+            try:
+                return bool(await self._redis.set(f"{self.prefix}:{kind}:{key}", 1, nx=True, ex=self.ttl))
+            except aioredis.RedisError as err:
+                log.error("Redis unavailable, tracking scam %s in memory: %s", kind, err)
+        return store.add(key)
+
+    async def _discard(self, store, kind, key):
+        store.discard(key)
+        if self._redis is not None:
+            try:
+                await self._redis.delete(f"{self.prefix}:{kind}:{key}")
+            except aioredis.RedisError as err:
+                log.error("Redis unavailable, unable to forget scam %s: %s", kind, err)
+
+    async def add_url(self, url: str) -> bool:
+        """Track a scam URL. Returns False if it was already tracked."""
+        return await self._add(self._urls, "url", self._url_key(url))
+
+    async def add_user(self, user_id: int) -> bool:
+        """Track the author of a scam. Returns False if it was already tracked."""
+        return await self._add(self._users, "user", str(user_id))
+
+    async def forget(self, url: str = None, user_id: int = None):
+        """Stop tracking a URL and/or an author, once their review is done."""
+        if url is not None:
+            await self._discard(self._urls, "url", self._url_key(url))
+        if user_id is not None:
+            await self._discard(self._users, "user", str(user_id))
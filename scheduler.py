@@ -0,0 +1,216 @@
+# pylint: disable=F0401, W0702, W0703, W0105, W0613
+# pyright: reportMissingImports=false, reportMissingModuleSource=false
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+import pytz
+import discord
+import config
+import logsetup
+
+
+#Setup module logging
+log = logsetup.get_logger(__name__)
+
+
+tz_TX = pytz.timezone("US/Central")
+TIME_FORMAT = "%b-%d-%Y %H:%M:%S"
+
+# Timer kinds, matching the columns of the timers table
+MUTE = "mute"
+BAN = "ban"
+
+# Timers due within WINDOW are kept in memory, the rest stay in the database
+WINDOW = timedelta(hours=1)
+# Expired timers handled at the same time
+MAX_CONCURRENT = 5
+
+
+def now():
+    """Current time as stored in the timers table (naive, US/Central)."""
+    return datetime.now(tz_TX).replace(tzinfo=None)
+
+
+def parse_time(value):
+    """Convert a timers table date to a naive datetime."""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.strptime(value, TIME_FORMAT)
+
+
+class TimerScheduler:
+    """Expire mute and tempban timers from a single task.
+
+    Deadlines due within WINDOW are loaded from the timers table with a range
+    query and kept in a min-heap; the window is refilled when it runs out.
+    The task sleeps until the earliest deadline, or until a new timer is
+    armed, and hands expired timers to bounded concurrent tasks, so a slow
+    unban never delays other unmutes and timers survive restarts.
+    """
+
+    def __init__(self, bot, database):
+        self.bot = bot
+        self.database = database
+        self._heap = [] # (due, user_id, kind), may hold stale entries
+        self._due = {} # (user_id, kind) -> current due time
+        self._running = {} # (user_id, kind) -> due time being expired
+        self._pending = {} # (user_id, kind) -> due time armed while being expired
+        self._tasks = set()
+        self._limit = asyncio.Semaphore(MAX_CONCURRENT)
+        self._window_end = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def start(self):
+        """Load pending timers and start the expiry task, once."""
+        if self._task is not None and not self._task.done():
+            return
+        await self.load()
+        self._task = asyncio.create_task(self._run())
+
+    async def load(self):
+        """Arm the stored timers due before the end of the next window."""
+        window_end = now() + WINDOW
+        for row in await self.database.getDueTimers(window_end):
+            try:
+                if row['mute'] and row['endMute'] and parse_time(row['endMute']) <= window_end:
+                    self._push(row['user_id'], MUTE, parse_time(row['endMute']))
+                if row['ban'] and row['endBan'] and parse_time(row['endBan']) <= window_end:
+                    self._push(row['user_id'], BAN, parse_time(row['endBan']))
+            except ValueError:
+                log.exception("Invalid timer for user %s, skipping", row['user_id'])
+        self._window_end = window_end
+        log.info("Loaded timers due before %s, %d armed", window_end, len(self._due))
+        self._wakeup.set()
+
+    def schedule(self, user_id, kind: str, due: datetime):
+        """Arm or move a timer. The timer must already be stored in the database."""
+        # Whole seconds, as stored in the timers table
+        due = due.replace(tzinfo=None, microsecond=0)
+        if self._window_end is not None and due > self._window_end:
+            # Picked up from the database when its window is loaded
+            self._due.pop((str(user_id), kind), None)
+            self._pending.pop((str(user_id), kind), None)
+            return
+        self._push(str(user_id), kind, due)
+        self._wakeup.set()
+
+    def cancel(self, user_id, kind: str = None):
+        """Disarm the timers of a user, all kinds if none is given."""
+        for k in (kind,) if kind else (MUTE, BAN):
+            self._due.pop((str(user_id), k), None)
+            self._pending.pop((str(user_id), k), None)
+        # Stale heap entries are skipped when they reach the top
+
+    def _push(self, user_id, kind, due):
+        key = (user_id, kind)
+        if key in self._running:
+            # Armed once the current expiry is done, unless it is the one expiring
+            if due != self._running[key]:
+                self._pending[key] = due
+            return
+        if self._due.get(key) == due:
+            return
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, user_id, kind))
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+
+            if now() >= self._window_end:
+                try:
+                    await self.load()
+                except Exception:
+                    log.exception("Error while loading timers, retrying next window")
+                    self._window_end = now() + WINDOW
+
+            # Drop cancelled or rescheduled entries
+            while self._heap and self._due.get(self._heap[0][1:]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+
+            # Hand every expired timer to its own task
+            while self._heap and self._heap[0][0] <= now():
+                due, user_id, kind = heapq.heappop(self._heap)
+                if self._due.get((user_id, kind)) != due:
+                    continue
+                del self._due[(user_id, kind)]
+                self._running[(user_id, kind)] = due
+                task = asyncio.create_task(self._expire(user_id, kind, due))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            wake_at = self._window_end
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+            delay = (wake_at - now()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _expire(self, user_id, kind, due):
+        try:
+            async with self._limit:
+                if kind == MUTE:
+                    await self._expire_mute(user_id, due)
+                else:
+                    await self._expire_ban(user_id, due)
+        except Exception:
+            # The row is still stored, retried when the next window is loaded
+            log.exception("Error while expiring %s timer for user %s", kind, user_id)
+        finally:
+            del self._running[(user_id, kind)]
+            # Timer set again while this one was expiring
+            pending = self._pending.pop((user_id, kind), None)
+            if pending is not None:
+                self._push(user_id, kind, pending)
+                self._wakeup.set()
+
+    async def _get_guild(self):
+        return self.bot.get_guild(config.GUILD) or await self.bot.fetch_guild(config.GUILD)
+
+    async def _expire_mute(self, user_id, due):
+        guild = await self._get_guild()
+
+        try:
+            member = guild.get_member(int(user_id)) or await guild.fetch_member(int(user_id))
+            await member.remove_roles(guild.get_role(config.MUTE_ID))
+            log.info("Timer ended - User %s has been unmuted", member)
+
+            embed = discord.Embed(
+                title="Timed mute complete",
+                description=f"User {member.mention} has been unmuted automatically.",
+                colour=config.YELLOW,
+            )
+            embed.set_footer(text=config.FOOTER)
+
+            self.bot.modlog.post(embed)
+        except discord.HTTPException:
+            log.exception("Error in fetching user %s, removing entry from db...", user_id)
+
+        # Keep a mute set again meanwhile, it has its own timer
+        await self.database.delTimerMute(user_id, due)
+
+    async def _expire_ban(self, user_id, due):
+        guild = await self._get_guild()
+
+        try:
+            user = await self.bot.resolver.resolve(user_id) or discord.Object(id=int(user_id))
+            await guild.unban(user, reason="Temp ban concluded")
+            log.info("Timer ended - User %s has been unbanned.", user)
+
+            embed = discord.Embed(
+                title="Timed ban complete",
+                description=f"User <@{user_id}> has been unbanned automatically.",
+                colour=config.YELLOW,
+            )
+            embed.set_footer(text=config.FOOTER)
+
+            self.bot.modlog.post(embed)
+        except discord.HTTPException:
+            log.exception("Error while executing timed unban for user %s", user_id)
+
+        # Keep a ban set again meanwhile, it has its own timer
+        await self.database.delTimerBan(user_id, due)
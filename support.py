@@ -4,6 +4,11 @@ import discord
 from datetime import datetime
 import pytz
 import config
+import logsetup
+
+
+#Setup module logging
+log = logsetup.get_logger(__name__)
 
 # Define a simple view with two buttons, confirm and cancel
 class Confirm(discord.ui.View):
@@ -29,49 +34,6 @@ class Confirm(discord.ui.View):
         self.stop()
 
 
-# Define a view with an Unban button
-class Unban(discord.ui.View):
-    def __init__(self):
-        super().__init__(timeout=None)
-        self.value = None
-        self.user = None
-        self.inter = None
-
-    @discord.ui.button(label="Unban", style=discord.ButtonStyle.red)
-    async def unban(self, button: discord.ui.Button, interaction: discord.Interaction):
-        await interaction.response.send_message("Unbanning", ephemeral=True)
-        self.value = True
-        self.user = interaction.user
-        self.inter = interaction
-        self.stop()
-
-
-# Define a view for banning possible scams
-class Scam(discord.ui.View):
-    def __init__(self, url):
-        super().__init__(timeout=None)
-        self.value = None
-        self.url = url
-        self.user = None
-        self.inter = None
-
-    @discord.ui.button(label="Ban", style=discord.ButtonStyle.red)
-    async def ban(self, button: discord.ui.Button, interaction: discord.Interaction):
-        await interaction.response.send_message("Banning", ephemeral=True)
-        self.value = True
-        self.user = interaction.user
-        self.inter = interaction
-        self.stop()
-
-    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.grey)
-    async def cancel(self, button: discord.ui.Button, interaction: discord.Interaction):
-        await interaction.response.send_message("Cancelling", ephemeral=True)
-        self.value = False
-        self.user = interaction.user
-        self.inter = interaction
-        self.stop()
-
-
 class BanButton(discord.ui.Button):
     def __init__(self, button_id):
         super().__init__(
@@ -97,43 +59,65 @@ class StopPoll(discord.ui.View):
         self.value = True
         self.stop()
 
-# Define a view with an Undo button for timeouts
-class Untimeout(discord.ui.View):
-    def __init__(self):
-        super().__init__(timeout=None)
-        self.value = None
-        self.user = None
-        self.inter = None
-
-    @discord.ui.button(label="Undo", style=discord.ButtonStyle.red)
-    async def untimeout(self, button: discord.ui.Button, interaction: discord.Interaction):
-        await interaction.response.send_message("Undoing timeout", ephemeral=True)
-        self.value = True
-        self.user = interaction.user
-        self.inter = interaction
-        self.stop()
-
-
-class Remove(discord.ui.View):
-    def __init__(self):
-        super().__init__(timeout=None)
-        self.user = None
-        self.op = None
-        self.inter = None
-
-    @discord.ui.button(label="Remove", style=discord.ButtonStyle.red)
-    async def remove(self, button: discord.ui.Button, interaction: discord.Interaction):
+# Define a view with previous and next buttons over pages rendered on demand
+class Paginator(discord.ui.View):
+    """Browse pages that are fetched and rendered one at a time.
 
-        owner = interaction.message.author
-        role = interaction.message.guild.get_role(config.MOD_ID)
+    render is a coroutine function taking the cursor of a page and its
+    0-based number, returning the embed of the page and the cursor of the
+    next one, None on the last page. The first page has cursor None.
+    """
 
-        self.user = interaction.user
-        self.inter = interaction
-        if owner == interaction.user or role in interaction.user.roles:
-            await interaction.response.send_message(content="Removing embed...", ephemeral=True)
-            self.stop()
-        else:
-            await interaction.response.send_message(content="You cannot do this action", ephemeral=True)
+    def __init__(self, render, author: discord.User = None, timeout: float = 180):
+        super().__init__(timeout=timeout)
+        self.render = render
+        self.author = author
+        self._cursors = [None] # cursors of the pages up to the current one
+        self._next = None
+
+    async def first_page(self) -> discord.Embed:
+        """Render the first page, to be sent along with the view."""
+        embed, self._next = await self.render(None, 0)
+        self._update_buttons()
+        return embed
+
+    @property
+    def has_pages(self) -> bool:
+        return self._next is not None
+
+    def _update_buttons(self):
+        self.previous_page.disabled = len(self._cursors) == 1
+        self.next_page.disabled = self._next is None
+
+    async def _show(self, interaction: discord.Interaction):
+        embed, self._next = await self.render(self._cursors[-1], len(self._cursors) - 1)
+        self._update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    async def on_timeout(self):
+        # Keep the page shown, with buttons that no longer answer disabled
+        self.disable_all_items()
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException as err:
+                log.error("Unable to disable the buttons of an expired paginator: %s", err)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if self.author is not None and interaction.user != self.author:
+            await interaction.response.send_message("You cannot do this action", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.grey, disabled=True)
+    async def previous_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        self._cursors.pop()
+        await self._show(interaction)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.blurple)
+    async def next_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        self._cursors.append(self._next)
+        await self._show(interaction)
 
 tz_TX = pytz.timezone("US/Central")
 TIME_FORMAT = "%b-%d-%Y %H:%M:%S"
@@ -190,4 +174,232 @@ class Survivor(discord.ui.View):
             await interaction.user.remove_roles(role, reason="Member pressed button in #rules channel")
             await interaction.response.send_message("Sad to see you go! You can join back any time.", ephemeral=True)
         else:
-            await interaction.response.send_message("You're not a Survivor! Can't remove a role you don't have.", ephemeral=True)
\ No newline at end of file
+            await interaction.response.send_message("You're not a Survivor! Can't remove a role you don't have.", ephemeral=True)
+
+# Kinds of review stored in the reviews table
+REVIEW_SCAM = "scam"
+REVIEW_UNBAN = "unban"
+REVIEW_UNTIMEOUT = "untimeout"
+REVIEW_REMOVE = "remove"
+
+
+async def store_review(database, message: discord.Message, kind: str, user_id: str, data: dict = None):
+    """Store the review of a message whose buttons were just posted.
+
+    Removes the buttons and re-raises when the review can't be stored,
+    nothing would be there to handle them.
+    """
+    try:
+        await database.addReview(str(message.id), kind, user_id, data)
+    except Exception:
+        try:
+            await message.edit(view=None)
+        except discord.HTTPException as err:
+            log.error("Unable to remove the buttons of an unstored review: %s", err)
+        raise
+
+
+async def load_review(interaction: discord.Interaction, kind: str) -> dict:
+    """Return the stored review for the message the button belongs to.
+
+    Answers the interaction and returns None when there is no review of
+    this kind. A review that is not stored yet, its buttons are posted
+    first, keeps them; one of another kind was handled and drops them.
+    """
+    review = await interaction.client.database.getReview(str(interaction.message.id))
+    if review is None:
+        await interaction.response.send_message("This review is still being saved, try again in a moment", ephemeral=True)
+        return None
+    if review['kind'] != kind:
+        await interaction.response.send_message("This review was already handled", ephemeral=True)
+        await interaction.message.edit(view=None)
+        return None
+    return review
+
+
+async def claim_review(interaction: discord.Interaction, review: dict) -> bool:
+    """Take a loaded review for handling by deleting it.
+
+    Only one click can delete the row, the others are answered and get
+    False, so two moderators never act on the same review.
+    """
+    if await interaction.client.database.delReview(review['message_id']):
+        return True
+    await interaction.response.send_message("This review was already handled", ephemeral=True)
+    return False
+
+
+def review_embed(interaction: discord.Interaction, title: str, description: str, colour: int) -> discord.Embed:
+    """Copy the embed of a review message with a new title, description and colour."""
+    embeds = interaction.message.embeds
+    embed = embeds[0].copy() if embeds else discord.Embed()
+    embed.title = title
+    embed.description = description
+    embed.colour = colour
+    return embed
+
+
+def review_users(review: dict) -> list:
+    """IDs of the authors of a scam review, every account of a scam wave."""
+    return [int(user_id) for user_id in review['data'].get('users') or [review['user_id']]]
+
+
+async def forget_scam(interaction: discord.Interaction, review: dict):
+    """Stop tracking a reviewed scam URL, its authors and its incident."""
+    scams = interaction.client.scams
+    await scams.forget(url=review['data'].get('url'))
+    for user_id in review_users(review):
+        await scams.forget(user_id=user_id)
+    interaction.client.incidents.close(interaction.message.id)
+
+
+# The review views below are persistent: one instance of each is registered
+# with bot.add_view, buttons are routed through their custom_id and the state
+# of each review lives in the reviews table, keyed by message ID.
+
+# Define a view for banning possible scams, every account of a scam wave at once
+class ScamReview(discord.ui.View):
+    # Accounts banned per bulk ban request, the API limit
+    BULK_BAN_SIZE = 200
+
+    def __init__(self, accounts: int = 1):
+        super().__init__(timeout=None)
+        if accounts > 1:
+            self.ban.label = f"Ban all ({accounts})"
+
+    @discord.ui.button(label="Ban", custom_id="review-scam-ban", style=discord.ButtonStyle.red)
+    async def ban(self, button: discord.ui.Button, interaction: discord.Interaction):
+        review = await load_review(interaction, REVIEW_SCAM)
+        if review is None or not await claim_review(interaction, review):
+            return
+        await interaction.response.send_message("Banning", ephemeral=True)
+        log.info("Spam confirmed by %s", interaction.user)
+
+        # Never ban a moderator whose account was caught by the filters
+        modrole = interaction.guild.get_role(config.MOD_ID)
+        targets = []
+        for user_id in review_users(review):
+            member = interaction.guild.get_member(user_id)
+            if member is None or modrole not in member.roles:
+                targets.append(discord.Object(id=user_id))
+
+        description = f"Review of the blocked message was done by {interaction.user}"
+        if not targets:
+            description += ", no bannable users: every account is a moderator"
+        embed = review_embed(
+            interaction, "Possible scam - manual review completed", description, config.GREEN,
+        )
+        await interaction.message.edit(embed=embed, view=None)
+
+        if targets:
+            reason = f"Spam message confirmed by {interaction.user}"
+            if len(targets) == 1:
+                await interaction.guild.ban(
+                    targets[0], reason=reason,
+                    delete_message_seconds=43200, # 12 hours
+                )
+            else:
+                for i in range(0, len(targets), self.BULK_BAN_SIZE):
+                    await interaction.guild.bulk_ban(
+                        *targets[i:i + self.BULK_BAN_SIZE], reason=reason,
+                        delete_message_seconds=43200,
+                    )
+        await forget_scam(interaction, review)
+
+    @discord.ui.button(label="Cancel", custom_id="review-scam-cancel", style=discord.ButtonStyle.grey)
+    async def cancel(self, button: discord.ui.Button, interaction: discord.Interaction):
+        review = await load_review(interaction, REVIEW_SCAM)
+        if review is None or not await claim_review(interaction, review):
+            return
+        await interaction.response.send_message("Cancelling", ephemeral=True)
+        log.info("Spam negated by %s", interaction.user)
+
+        embed = review_embed(
+            interaction,
+            "Possible scam - manual review completed",
+            f"Review of the blocked message was done by {interaction.user}",
+            config.GREEN,
+        )
+        await interaction.message.edit(embed=embed, view=None)
+
+        for user_id in review_users(review):
+            member = interaction.guild.get_member(user_id)
+            try:
+                if member is not None:
+                    await member.remove_timeout(reason="Spam review completed. Timeout removed")
+            except discord.HTTPException as err:
+                log.error("Unable to remove spam review timeout: %s", err)
+        await forget_scam(interaction, review)
+
+
+# Define a view with an Unban button
+class UnbanReview(discord.ui.View):
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="Unban", custom_id="review-unban", style=discord.ButtonStyle.red)
+    async def unban(self, button: discord.ui.Button, interaction: discord.Interaction):
+        review = await load_review(interaction, REVIEW_UNBAN)
+        if review is None or not await claim_review(interaction, review):
+            return
+        await interaction.response.send_message("Unbanning", ephemeral=True)
+
+        reason = review['data'].get('reason')
+        await interaction.guild.unban(discord.Object(id=int(review['user_id'])))
+
+        # Remove ban from db
+        await interaction.client.database.delBan(review['user_id'], reason)
+
+        # Edit ban log embed to reflect
+        embed = review_embed(
+            interaction,
+            "User ban - canceled",
+            f"User {review['data'].get('name')} was unbanned by {interaction.user}",
+            config.GREEN,
+        )
+        await interaction.message.edit(embed=embed, view=None)
+
+
+# Define a view with an Undo button for timeouts
+class UntimeoutReview(discord.ui.View):
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="Undo", custom_id="review-untimeout", style=discord.ButtonStyle.red)
+    async def untimeout(self, button: discord.ui.Button, interaction: discord.Interaction):
+        review = await load_review(interaction, REVIEW_UNTIMEOUT)
+        if review is None or not await claim_review(interaction, review):
+            return
+        await interaction.response.send_message("Undoing timeout", ephemeral=True)
+
+        member = interaction.guild.get_member(int(review['user_id']))
+        if member is not None:
+            await member.remove_timeout(reason="Timeout removed")
+        await interaction.message.edit(view=None)
+
+
+# Define a view to remove the embed of a linked message
+class RemoveReview(discord.ui.View):
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="Remove", custom_id="review-remove", style=discord.ButtonStyle.red)
+    async def remove(self, button: discord.ui.Button, interaction: discord.Interaction):
+        review = await load_review(interaction, REVIEW_REMOVE)
+        if review is None:
+            return
+
+        # Only the author of the linked message or a mod can remove the embed
+        role = interaction.guild.get_role(config.MOD_ID)
+        if str(interaction.user.id) != review['user_id'] and role not in interaction.user.roles:
+            await interaction.response.send_message(content="You cannot do this action", ephemeral=True)
+            return
+        if not await claim_review(interaction, review):
+            return
+
+        await interaction.response.send_message(content="Removing embed...", ephemeral=True)
+        await interaction.message.delete(reason="Poster removed embed")
+
+
+# Views to register with bot.add_view on startup
+REVIEW_VIEWS = (ScamReview, UnbanReview, UntimeoutReview, RemoveReview)